@@ -0,0 +1,144 @@
+"""
+Hyperliquid info payloads for the benchmarks, and the stub that serves them.
+
+Recorded payloads (bench/fixtures/<info type>.json, written by
+bench/record_fixtures.py; none ship with the repo) are used when present;
+otherwise a seeded synthetic universe of the same shape is generated:
+~220 perps and ~260 spot pairs, which merges to roughly the ~400 assets
+the live API lists.
+Either can be scaled up (scale_payloads) to stress the hot paths.
+"""
+
+import json
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+INFO_TYPES = ("metaAndAssetCtxs", "spotMetaAndAssetCtxs")
+
+SYNTH_PERPS = 220
+SYNTH_SPOTS = 260
+SYNTH_DELISTED_SHARE = 0.08
+
+
+def load_recorded(fixture_dir=FIXTURE_DIR):
+    """{info type: parsed payload} from recorded files, or None if missing."""
+    payloads = {}
+    for info_type in INFO_TYPES:
+        path = os.path.join(fixture_dir, f"{info_type}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            payloads[info_type] = json.load(f)
+    return payloads
+
+
+def _px(rng, lo=-4, hi=5):
+    return 10 ** rng.uniform(lo, hi)
+
+
+def synthetic_payloads(ref_symbols=(), seed=7):
+    """A seeded universe shaped like the live info responses.
+
+    Perps start with `ref_symbols` (so market caps resolve against COIN_REF)
+    and are padded with made-up names; spot pairs mix canonical, "@<index>"
+    and below-threshold-volume markets.
+    """
+    rng = random.Random(seed)
+    names = list(ref_symbols)[:SYNTH_PERPS]
+    names += [f"SYN{i}" for i in range(SYNTH_PERPS - len(names))]
+
+    universe, ctxs = [], []
+    for name in names:
+        market = {"name": name, "szDecimals": rng.randint(0, 5),
+                  "maxLeverage": rng.choice((3, 5, 10, 20, 25, 40, 50))}
+        if name.startswith("SYN") and rng.random() < SYNTH_DELISTED_SHARE:
+            market["isDelisted"] = True
+        universe.append(market)
+        px = _px(rng)
+        mid = px * (1 + rng.uniform(-0.08, 0.08))
+        ctxs.append({
+            "funding": f"{rng.uniform(-3e-4, 3e-4):.8f}",
+            "openInterest": f"{rng.uniform(1e4, 5e8) / px:.4f}",
+            "prevDayPx": f"{px:.6g}",
+            "dayNtlVlm": f"{10 ** rng.uniform(3, 9.5):.2f}",
+            "premium": f"{rng.uniform(-1e-3, 1e-3):.6f}",
+            "oraclePx": f"{mid:.6g}",
+            "markPx": f"{mid:.6g}",
+            "midPx": f"{mid:.6g}",
+            "impactPxs": [f"{mid * 0.999:.6g}", f"{mid * 1.001:.6g}"],
+        })
+    perps = [{"universe": universe}, ctxs]
+
+    tokens = [{"name": "USDC", "index": 0, "szDecimals": 8}]
+    spot_universe, spot_ctxs = [], []
+    for i in range(1, SYNTH_SPOTS + 1):
+        tokens.append({"name": f"TOK{i}", "index": i, "szDecimals": 2})
+        canonical = i <= 8
+        spot_universe.append({"tokens": [i, 0], "index": i - 1, "isCanonical": canonical,
+                              "name": f"TOK{i}/USDC" if canonical else f"@{i}"})
+        px = _px(rng, -5, 3)
+        mid = px * (1 + rng.uniform(-0.1, 0.1))
+        spot_ctxs.append({
+            "prevDayPx": f"{px:.6g}",
+            "dayNtlVlm": f"{10 ** rng.uniform(0, 7):.2f}",
+            "markPx": f"{mid:.6g}",
+            "midPx": f"{mid:.6g}" if rng.random() > 0.05 else None,
+            "circulatingSupply": f"{10 ** rng.uniform(6, 10):.0f}",
+            "coin": spot_universe[-1]["name"],
+        })
+    spots = [{"tokens": tokens, "universe": spot_universe}, spot_ctxs]
+    return {"metaAndAssetCtxs": perps, "spotMetaAndAssetCtxs": spots}
+
+
+def scale_payloads(payloads, scale):
+    """Repeat every perp and spot market `scale` times under new names."""
+    if scale <= 1:
+        return payloads
+    (perp_meta, perp_ctxs) = payloads["metaAndAssetCtxs"]
+    (spot_meta, spot_ctxs) = payloads["spotMetaAndAssetCtxs"]
+
+    universe, ctxs = list(perp_meta["universe"]), list(perp_ctxs)
+    for k in range(2, scale + 1):
+        universe += [dict(m, name=f"{m['name']}_{k}") for m in perp_meta["universe"]]
+        ctxs += perp_ctxs
+
+    tokens = list(spot_meta["tokens"])
+    spot_universe, ctxs_out = list(spot_meta["universe"]), list(spot_ctxs)
+    token_by_index = {t["index"]: t for t in spot_meta["tokens"]}
+    next_index = max(token_by_index) + 1
+    for k in range(2, scale + 1):
+        for market, ctx in zip(spot_meta["universe"], spot_ctxs):
+            base = token_by_index.get(market["tokens"][0], {"name": "?"})
+            tokens.append(dict(base, name=f"{base['name']}_{k}", index=next_index))
+            pair_index = len(spot_universe)
+            spot_universe.append(dict(market, tokens=[next_index] + market["tokens"][1:],
+                                      index=pair_index, name=f"@{pair_index}"))
+            ctxs_out.append(ctx)
+            next_index += 1
+    return {
+        "metaAndAssetCtxs": [dict(perp_meta, universe=universe), ctxs],
+        "spotMetaAndAssetCtxs": [dict(spot_meta, tokens=tokens, universe=spot_universe), ctxs_out],
+    }
+
+
+class UpstreamStub:
+    """Drop-in for `_hl_post`: answers info requests from fixture payloads.
+
+    Responses are kept encoded and parsed on every call, so the JSON
+    decoding a real request pays is still measured.
+    """
+
+    def __init__(self, payloads):
+        self.bodies = {t: json.dumps(p).encode() for t, p in payloads.items()}
+        self.calls = 0
+
+    def __call__(self, payload, *args, **kwargs):
+        self.calls += 1
+        return json.loads(self.bodies[payload["type"]])
+
+    def size(self):
+        """Number of perp + spot markets in the payloads."""
+        perps = json.loads(self.bodies["metaAndAssetCtxs"])[0]["universe"]
+        spots = json.loads(self.bodies["spotMetaAndAssetCtxs"])[0]["universe"]
+        return len(perps) + len(spots)
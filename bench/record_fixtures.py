@@ -0,0 +1,39 @@
+"""
+Record live Hyperliquid info payloads for the benchmarks.
+
+    python bench/record_fixtures.py
+
+Writes bench/fixtures/metaAndAssetCtxs.json and spotMetaAndAssetCtxs.json;
+bench/run.py replays them instead of the synthetic universe once present.
+"""
+
+import argparse
+import json
+import os
+import urllib.request
+
+from fixtures import FIXTURE_DIR, INFO_TYPES
+
+HYPERLIQUID_API_URL = "https://api.hyperliquid.xyz/info"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--url", default=HYPERLIQUID_API_URL)
+    parser.add_argument("--out", default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for info_type in INFO_TYPES:
+        req = urllib.request.Request(args.url, data=json.dumps({"type": info_type}).encode(),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            payload = json.load(resp)
+        path = os.path.join(args.out, f"{info_type}.json")
+        with open(path, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        print(f"wrote {path} ({os.path.getsize(path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Benchmarks for the coin pipeline and every route of both servers.
+
+    python bench/run.py                        # core, app and api; 1x and 10x universes
+    python bench/run.py --target app --scale 1 --only coins
+    python bench/run.py --save baseline.json
+    python bench/run.py --compare baseline.json   # exits 1 on a regression
+
+Upstream requests are answered by UpstreamStub (bench/fixtures.py) from
+recorded payloads when bench/fixtures/ has them, else from the synthetic
+universe (none are committed: run bench/record_fixtures.py first to replay
+live data; until then every number is synthetic), so the numbers cover parsing, merging, formatting and encoding
+but not the network.  Engine functions (coinhacko) are timed directly;
+Flask routes go through the test client and the Vercel handler is served
+on a loopback port.  Each case reports ops/sec and p50/p99 latency from a
+timed loop, then bytes allocated per op (tracemalloc peak) from a shorter
+second pass.
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures import UpstreamStub, load_recorded, scale_payloads, synthetic_payloads
+from coinhacko.reference import COIN_REF
+
+DEFAULT_SCALES = (1, 10)
+DEFAULT_DURATION = 1.0      # seconds of timed calls per case
+MIN_ITERATIONS = 5
+ALLOC_SAMPLES = 20          # calls traced for allocations per case
+REGRESSION_THRESHOLD = 0.20
+
+# Requested from both servers; {since} is filled in per call
+ROUTES = (
+    "/api/coins",
+    "/api/coins?page=2&per_page=50",
+    "/api/coins?sort=volume&type=perp",
+    "/api/coins?q=b",
+    "/api/coins?format=compact",
+    "/api/coins?sparkline=false&precision=6",
+    "/api/coins?fields=current_price,market_cap&sparkline=24",
+    "/api/coins?since={since}",
+    "/api/coins/batch?ids=btc,eth,sol,doge&fields=current_price,market_cap",
+    "/api/coin/btc",
+    "/api/coin/btc/history?field=funding&res=1m",
+    "/api/status",
+    "/api/liquidations",
+    "/api/liquidations?symbols=ALL",
+    "/api/liquidations/heatmap?symbol=BTC",
+    "/metrics",
+)
+# Also requested with Accept-Encoding: gzip
+GZIP_ROUTES = (
+    "/api/coins",
+    "/api/coins?per_page=500",
+)
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+def measure(fn, duration=DEFAULT_DURATION, alloc_samples=ALLOC_SAMPLES):
+    """Time `fn` for `duration` seconds, then trace its allocations."""
+    fn()  # warm-up: lazy imports, first-call memos
+    times = []
+    deadline = time.perf_counter() + duration
+    while len(times) < MIN_ITERATIONS or time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        fn()
+        times.append(time.perf_counter_ns() - start)
+    times.sort()
+
+    allocs = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(alloc_samples, len(times))):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            allocs.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops": len(times) / (sum(times) / 1e9),
+        "p50_us": times[len(times) // 2] / 1e3,
+        "p99_us": times[min(len(times) - 1, int(len(times) * 0.99))] / 1e3,
+        "alloc_kib": sum(allocs) / len(allocs) / 1024,
+    }
+
+
+def _checked(fn, label):
+    """Wrap a route call so a non-200 fails the run instead of timing errors."""
+    def call():
+        status = fn()
+        if status != 200:
+            raise RuntimeError(f"{label} returned {status}")
+    return call
+
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+def load_core():
+    from coinhacko import engine
+    # Keep refreshes under the benchmark's control: no scheduler or WebSocket
+    # threads, and never treat the snapshot as stale.
+    engine.start_background = lambda: None
+    engine.CACHE_DURATION = float("inf")
+    engine.print = lambda *args, **kwargs: None  # per-refresh log lines
+    return engine
+
+
+def load_app():
+    load_core()
+    import app
+    return app
+
+
+def load_api():
+    from coinhacko import bootstrap
+    load_core()
+    # Time the engine path: no bootstrap to answer from (and no cold-start
+    # warm-up fetch), _install publishes the snapshots instead.
+    bootstrap.BOOTSTRAP_PATH = bootstrap.BUNDLED_BOOTSTRAP_PATH = ""
+    spec = importlib.util.spec_from_file_location("api_index", os.path.join(ROOT, "api", "index.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _install(stub):
+    """Answer upstream requests from `stub` and publish two versions (the
+    first is the base for ?since=)."""
+    from coinhacko import engine, upstream
+    upstream._hl_post = stub
+    engine.update_cache()
+    engine.update_cache()
+    return engine
+
+
+def core_cases(engine, stub):
+    from coinhacko import liquidations, market, shared, snapshot, upstream
+    _install(stub)
+    frame = market.market_table.freeze()
+    perp_meta, perp_ctxs = upstream.market_data["metaAndAssetCtxs"]["data"]
+    universe = perp_meta["universe"]
+    store = shared.SharedStore(os.path.join(tempfile.mkdtemp(), "store.bin"))
+    entries = {"metaAndAssetCtxs": upstream.market_data["metaAndAssetCtxs"]}
+
+    def cold_format():
+        snap = engine.snapshot
+        snapshot.Snapshot(snap.version, snap.ts, frame).coins()
+
+    def cold_page(view=None):
+        snap = engine.snapshot
+        snapshot.Snapshot(snap.version, snap.ts, frame).page(1, 500, view=view)
+
+    lean = snapshot.parse_view({"sparkline": "false", "precision": "6"})
+
+    def shared_read():
+        store.version = 0
+        version, ts, frame_, sparklines, _ = store.read()
+        snapshot.Snapshot(version, ts, frame_, sparklines)
+
+    return {
+        "fetch_hyperliquid_data": market.fetch_hyperliquid_data,
+        "publish": engine.publish,
+        "update_cache": engine.update_cache,
+        "get_formatted_coins": engine.get_formatted_coins,
+        "format_coins (cold snapshot)": cold_format,
+        "page 500 (cold snapshot)": cold_page,
+        "page 500 sparkline=false precision=6 (cold snapshot)": lambda: cold_page(lean),
+        "estimate_liquidations": liquidations.estimate_liquidations,
+        "estimate_liquidations ALL": lambda: liquidations.estimate_liquidations(("ALL",)),
+        "compute_liquidation_matrix": lambda: liquidations.compute_liquidation_matrix(universe, perp_ctxs),
+        "shared store write": lambda: store.write(engine.snapshot, frame, entries),
+        "shared store read + Snapshot": shared_read,
+    }
+
+
+def _route_cases():
+    """(route, request headers) for every ROUTES and GZIP_ROUTES request."""
+    return [(route, {}) for route in ROUTES] + [(route, GZIP) for route in GZIP_ROUTES]
+
+
+def app_cases(app, stub):
+    engine = _install(stub)
+    client = app.app.test_client()
+    cases = {}
+    for route, headers in _route_cases():
+        def get(route=route, headers=headers):
+            return client.get(route.format(since=engine.snapshot.version - 1),
+                              headers=headers).status_code
+        cases[f"GET {route}{' (gzip)' if headers else ''}"] = _checked(get, route)
+    return cases
+
+
+def api_cases(api, stub):
+    engine = _install(stub)
+
+    class QuietHandler(api.handler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cases = {}
+    for route, headers in _route_cases():
+        def get(route=route, headers=headers):
+            conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+            try:
+                conn.request("GET", route.format(since=engine.snapshot.version - 1), headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                return resp.status
+            finally:
+                conn.close()
+        cases[f"GET {route}{' (gzip)' if headers else ''}"] = _checked(get, route)
+    return cases
+
+
+# The engine is shared, so core cases run once; app and api time their routes
+TARGETS = {"core": (load_core, core_cases), "app": (load_app, app_cases),
+           "api": (load_api, api_cases)}
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+def print_row(case, r):
+    print(f"  {case:<46} {r['ops']:>11,.0f} {r['p50_us']:>11,.1f} "
+          f"{r['p99_us']:>11,.1f} {r['alloc_kib']:>12,.1f}")
+
+
+def compare(results, baseline_path, threshold):
+    """Print cases that got slower or allocate more; returns their count."""
+    with open(baseline_path) as f:
+        baseline = {(r["target"], r["scale"], r["case"]): r for r in json.load(f)}
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["target"], r["scale"], r["case"]))
+        if old is None:
+            continue
+        problems = []
+        if r["ops"] < old["ops"] * (1 - threshold):
+            problems.append(f"ops/sec {old['ops']:,.0f} -> {r['ops']:,.0f}")
+        if r["alloc_kib"] > old["alloc_kib"] * (1 + threshold) + 1:
+            problems.append(f"alloc {old['alloc_kib']:,.1f} -> {r['alloc_kib']:,.1f} KiB")
+        if problems:
+            regressions += 1
+            print(f"REGRESSION {r['target']} x{r['scale']} {r['case']}: {'; '.join(problems)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--target", choices=("core", "app", "api", "all"), default="all")
+    parser.add_argument("--scale", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated universe multipliers (default 1,10)")
+    parser.add_argument("--only", default="", help="run cases whose name contains this")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--synthetic", action="store_true",
+                        help="ignore recorded fixtures")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from --save")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    targets = tuple(TARGETS) if args.target == "all" else (args.target,)
+    scales = [int(s) for s in args.scale.split(",")]
+    recorded = None if args.synthetic else load_recorded()
+    results = []
+
+    for target in targets:
+        load, build_cases = TARGETS[target]
+        module = load()
+        base = recorded or synthetic_payloads(list(COIN_REF))
+        for scale in scales:
+            stub = UpstreamStub(scale_payloads(base, scale))
+            cases = build_cases(module, stub)
+            print(f"\n{target} x{scale}: {stub.size()} markets "
+                  f"({'recorded' if recorded else 'synthetic'} fixtures)")
+            print(f"  {'case':<46} {'ops/sec':>11} {'p50 us':>11} {'p99 us':>11} {'alloc KiB/op':>12}")
+            for case, fn in cases.items():
+                if args.only not in case:
+                    continue
+                r = measure(fn, args.duration)
+                print_row(case, r)
+                results.append(dict(r, target=target, scale=scale, case=case))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Cold-start benchmark for the Vercel function (api/index.py).
+
+    python bench/startup.py                      # 20 fresh processes per scenario
+    python bench/startup.py --runs 50 --upstream-latency 0.4 --no-pyc
+    python bench/startup.py --save startup.json
+
+Each run spawns a new interpreter that imports api/index.py, serves it on a
+loopback port and requests /api/coins once, like the first invocation of a
+new serverless instance.  Scenarios:
+
+  cold       no bootstrap bundle: the first request imports the engine and
+             waits for the upstream fetch
+  bootstrap  a deploy-time bundle (as the vercel.json buildCommand writes)
+             is answered, stale, while the engine warms up
+
+Children run with VERCEL=1, so only the bundle is read, as in production.
+
+Upstream requests are answered by UpstreamStub after --upstream-latency
+seconds, installed by an import hook so import_ms covers every coinhacko
+module the function imports.  No recorded fixtures ship with the repo:
+unless bench/record_fixtures.py has been run, the payloads are the
+synthetic universe of bench/fixtures.py.  --no-pyc points the bytecode cache at an empty directory, as on
+a read-only bundle without __pycache__ (the stdlib recompiles too, so
+spawn-to-first-byte is overstated there).  Reported per scenario: module
+import time, time to the first response byte after import, and spawn to
+first byte (interpreter start included).
+"""
+
+import argparse
+import http.client
+import importlib.abc
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_RUNS = 20
+DEFAULT_UPSTREAM_LATENCY = 0.25  # seconds per info request
+SCENARIOS = ("cold", "bootstrap")
+
+
+# ---------------------------------------------------------------------------
+# Child: one cold start
+# ---------------------------------------------------------------------------
+class StubUpstream(importlib.abc.MetaPathFinder):
+    """Swaps `post` into coinhacko.upstream as soon as something imports it,
+    so the child never imports the package outside the timed api import."""
+
+    def __init__(self, post):
+        self.post = post
+
+    def find_spec(self, name, path, target=None):
+        if name != "coinhacko.upstream":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(name)
+        exec_module = spec.loader.exec_module
+
+        def exec_stubbed(module):
+            exec_module(module)
+            module._hl_post = self.post
+
+        spec.loader.exec_module = exec_stubbed
+        return spec
+
+
+def child(payloads_path, latency):
+    spawned = float(os.environ["STARTUP_SPAWNED"])
+    sys.path[:0] = [ROOT, BENCH]
+    from fixtures import UpstreamStub  # bench only; imports no coinhacko module
+
+    with open(payloads_path) as f:
+        stub = UpstreamStub(json.load(f))
+
+    def slow_stub(payload, *args, **kwargs):
+        time.sleep(latency)
+        return stub(payload)
+
+    sys.meta_path.insert(0, StubUpstream(slow_stub))
+
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("api_index", os.path.join(ROOT, "api", "index.py"))
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    imported = time.perf_counter()
+
+    class QuietHandler(api.handler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+    conn.request("GET", "/api/coins")
+    resp = conn.getresponse()
+    first_byte = time.perf_counter()
+    first_byte_wall = time.time()
+    resp.read()
+
+    print(json.dumps({
+        "status": resp.status,
+        "stale": resp.getheader("X-Coinhacko-Stale") is not None,
+        "import_ms": (imported - start) * 1e3,
+        "first_byte_ms": (first_byte - imported) * 1e3,
+        "spawn_to_first_byte_ms": (first_byte_wall - spawned) * 1e3,
+    }))
+
+
+# ---------------------------------------------------------------------------
+# Parent
+# ---------------------------------------------------------------------------
+def write_bootstrap(stub, path):
+    """Publish one snapshot from `stub` in-process and save it to `path`."""
+    sys.path[:0] = [ROOT]
+    from coinhacko import bootstrap, engine, upstream
+
+    engine.print = lambda *args, **kwargs: None
+    upstream._hl_post = stub
+    engine.update_cache()
+    bootstrap.save(engine.snapshot, path)
+
+
+def spawn(scenario, payloads_path, bootstrap_path, latency, pycache):
+    env = {k: v for k, v in os.environ.items() if k != "COINHACKO_BOOTSTRAP"}
+    env.update(VERCEL="1", COINHACKO_BOOTSTRAP_BUNDLE=bootstrap_path if scenario == "bootstrap" else "")
+    if pycache:
+        env["PYTHONPYCACHEPREFIX"] = pycache
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["STARTUP_SPAWNED"] = repr(time.time())
+    out = subprocess.run([sys.executable, __file__, "--child", payloads_path,
+                          "--upstream-latency", str(latency)],
+                         env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="processes per scenario")
+    parser.add_argument("--upstream-latency", type=float, default=DEFAULT_UPSTREAM_LATENCY)
+    parser.add_argument("--no-pyc", action="store_true", help="run without cached bytecode")
+    parser.add_argument("--save", help="write per-run results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.upstream_latency)
+        return
+
+    sys.path[:0] = [BENCH]
+    from fixtures import UpstreamStub, load_recorded, synthetic_payloads
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payloads = load_recorded()
+        if payloads is None:
+            sys.path[:0] = [ROOT]
+            from coinhacko.reference import COIN_REF
+            payloads = synthetic_payloads(list(COIN_REF))
+        payloads_path = os.path.join(tmp, "payloads.json")
+        with open(payloads_path, "w") as f:
+            json.dump(payloads, f)
+        bootstrap_path = os.path.join(tmp, "bootstrap.bin")
+        write_bootstrap(UpstreamStub(payloads), bootstrap_path)
+        pycache = os.path.join(tmp, "pycache") if args.no_pyc else None
+
+        results = []
+        print(f"{args.runs} runs per scenario, upstream latency {args.upstream_latency * 1e3:.0f} ms"
+              f"{', no bytecode cache' if args.no_pyc else ''}")
+        print(f"  {'scenario':<10} {'metric':<24} {'p50 ms':>9} {'p99 ms':>9}")
+        for scenario in SCENARIOS:
+            runs = []
+            for _ in range(args.runs):
+                if pycache:
+                    # Fresh, empty cache dir per run: nothing compiled survives
+                    pycache = tempfile.mkdtemp(dir=tmp)
+                runs.append(spawn(scenario, payloads_path, bootstrap_path,
+                                  args.upstream_latency, pycache))
+            bad = [r for r in runs if r["status"] != 200 or r["stale"] != (scenario == "bootstrap")]
+            if bad:
+                sys.exit(f"{scenario}: unexpected first response {bad[0]}")
+            for metric in ("import_ms", "first_byte_ms", "spawn_to_first_byte_ms"):
+                values = [r[metric] for r in runs]
+                print(f"  {scenario:<10} {metric:<24} {percentile(values, 0.5):>9.1f} "
+                      f"{percentile(values, 0.99):>9.1f}")
+            results.extend(dict(r, scenario=scenario) for r in runs)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
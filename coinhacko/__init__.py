@@ -0,0 +1,7 @@
+"""
+Coinhacko core engine: Hyperliquid ingestion, ranking, response snapshots
+and liquidation estimates.
+
+Shared by the Flask app (app.py) and the Vercel function (api/index.py),
+which are thin adapters over coinhacko.handlers.
+"""
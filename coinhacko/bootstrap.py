@@ -0,0 +1,161 @@
+"""
+Bootstrap snapshot for cold starts.
+
+The default /api/coins pages and every coin detail of a published snapshot,
+saved to disk so a fresh process can answer those routes immediately
+(flagged stale) while its first upstream fetch runs.  Stdlib only:
+api/index.py serves from it before the engine, and numpy, are imported.
+
+    python -m coinhacko.bootstrap [path]   # fetch once and write a bundle
+
+Two files are tried, in this order:
+
+  BOOTSTRAP_PATH          saved by a running process every
+                          BOOTSTRAP_SAVE_INTERVAL for the next process on the
+                          same host (a restarted server or worker).  Off on
+                          Vercel: every cold start is a new instance with an
+                          empty /tmp, so nothing could ever read it.
+  BUNDLED_BOOTSTRAP_PATH  written at deploy time by the vercel.json
+                          buildCommand and shipped with the function
+                          (includeFiles coinhacko/**).  It is as old as the
+                          deployment, so it has its own age limit: past
+                          BUNDLED_BOOTSTRAP_MAX_AGE cold starts wait for
+                          upstream again until the next deploy, rather than
+                          show prices from hours ago.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+# Set COINHACKO_BOOTSTRAP / COINHACKO_BOOTSTRAP_BUNDLE to an empty string to
+# turn either file off.
+BOOTSTRAP_PATH = os.environ.get(
+    "COINHACKO_BOOTSTRAP",
+    "" if os.environ.get("VERCEL") else os.path.join(tempfile.gettempdir(), "coinhacko-bootstrap.bin"))
+DEFAULT_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bootstrap.bin")
+BUNDLED_BOOTSTRAP_PATH = os.environ.get("COINHACKO_BOOTSTRAP_BUNDLE", DEFAULT_BUNDLE_PATH)
+BOOTSTRAP_MAX_AGE = 24 * 3600             # seconds; older saved files are ignored
+BUNDLED_BOOTSTRAP_MAX_AGE = 2 * 3600      # seconds; redeploy to refresh the bundle
+BOOTSTRAP_SAVE_INTERVAL = 60    # seconds between saves from the refresh loop
+STALE_HEADER = "X-Coinhacko-Stale"
+
+# File layout: magic line, JSON header line, then every body back to back
+_MAGIC = b"COINHACKO-BOOTSTRAP 1\n"
+
+
+def save(snap, path=BOOTSTRAP_PATH):
+    """Write the default pages and coin details of `snap` to `path`.
+
+    Pages carry "stale": true so clients can tell they predate the serving
+    process.  The file is replaced atomically.
+    """
+    from .snapshot import SNAPSHOT_PER_PAGE
+
+    bodies = {}
+    for per_page in SNAPSHOT_PER_PAGE:
+        for page in range(1, max(1, -(-len(snap) // per_page)) + 1):
+            bodies[f"page/{page}/{per_page}"] = b'{"stale":true,' + snap.page(page, per_page)[1:]
+    for i, coin_id in enumerate(snap.ids):
+        bodies[f"coin/{coin_id}"] = snap.fragment(i)
+
+    spans, pos = {}, 0
+    for key, body in bodies.items():
+        spans[key] = (pos, len(body))
+        pos += len(body)
+    header = json.dumps({"version": snap.version, "ts": snap.ts, "aliases": snap.aliases,
+                         "bodies": spans}, separators=(",", ":")).encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC + header + b"\n")
+        f.writelines(bodies.values())
+    os.replace(tmp, path)
+
+
+def load(paths=None, max_age=BOOTSTRAP_MAX_AGE):
+    """The first readable bootstrap of `paths` that is at most `max_age`
+    seconds old, or None.  By default: the saved file, then the deploy-time
+    bundle, each under its own age limit."""
+    if paths is None:
+        sources = [(p, age) for p, age in ((BOOTSTRAP_PATH, BOOTSTRAP_MAX_AGE),
+                                          (BUNDLED_BOOTSTRAP_PATH, BUNDLED_BOOTSTRAP_MAX_AGE)) if p]
+    else:
+        sources = [(p, max_age) for p in paths]
+    for path, max_age in sources:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if not data.startswith(_MAGIC):
+            continue
+        end = data.index(b"\n", len(_MAGIC))
+        header = json.loads(data[len(_MAGIC):end])
+        if time.time() - header["ts"] <= max_age:
+            return Bootstrap(header, memoryview(data)[end + 1:])
+    return None
+
+
+class Bootstrap:
+    """A loaded bootstrap file, answering the routes it has bodies for.
+
+    Both lookups return (status, body, headers) like coinhacko.handlers, or
+    None when the request needs the live engine (filters, deltas, other
+    formats or page sizes).
+    """
+
+    def __init__(self, header, blob):
+        self.version = header["version"]
+        self.ts = header["ts"]
+        self.etag = f"v{self.version}"
+        self.aliases = header["aliases"]
+        self._spans = header["bodies"]
+        self._blob = blob
+
+    def body(self, key):
+        span = self._spans.get(key)
+        if span is None:
+            return None
+        start, length = span
+        return bytes(self._blob[start:start + length])
+
+    def coins(self, args, if_none_match=None):
+        if set(args) - {"page", "per_page"}:
+            return None
+        try:
+            page, per_page = int(args.get("page", 1)), int(args.get("per_page", 100))
+        except ValueError:
+            return None
+        return self._respond(f"page/{page}/{per_page}", if_none_match)
+
+    def coin_detail(self, coin_id, args, if_none_match=None):
+        if args:
+            return None
+        key = coin_id.lower()
+        if f"coin/{key}" not in self._spans:
+            key = self.aliases.get(coin_id.upper())
+        return self._respond(f"coin/{key}", if_none_match)
+
+    def _respond(self, key, if_none_match):
+        if key not in self._spans:
+            return None
+        headers = {"ETag": f'"{self.etag}"', "Cache-Control": "no-cache", STALE_HEADER: "1"}
+        # Same weak comparison as coinhacko.handlers, which imports the engine
+        tags = {t.strip().removeprefix("W/") for t in (if_none_match or "").split(",")}
+        if f'"{self.etag}"' in tags or "*" in tags:
+            return 304, b"", headers
+        return 200, self.body(key), dict(headers, **{"Content-Type": "application/json"})
+
+
+if __name__ == "__main__":
+    import sys
+
+    from . import engine
+
+    engine.update_cache()
+    if not engine.snapshot.version:
+        sys.exit("Hyperliquid fetch failed; no bootstrap written")
+    out = sys.argv[1] if len(sys.argv) > 1 else BUNDLED_BOOTSTRAP_PATH or DEFAULT_BUNDLE_PATH
+    save(engine.snapshot, out)
+    print(f"wrote {out} ({os.path.getsize(out)} bytes, snapshot v{engine.snapshot.version})")
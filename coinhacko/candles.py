@@ -0,0 +1,212 @@
+"""
+Rolling 24h high/low from Hyperliquid hourly candles.
+
+A background trickle syncs each listed asset's candleSnapshot through a
+small worker pool.  Candle requests weigh as much as a market refresh's,
+so the trickle is rate limited to what the info endpoint's per-IP weight
+budget leaves after the refresh, with headroom to spare, and each asset
+is only re-synced about once an hour.  Between syncs
+every published price is folded into the asset's newest candle, so ranges
+follow the live price without an upstream request per symbol per refresh.
+Assets whose candles haven't been synced yet fall back to the estimate
+from the 24h change (see Snapshot).
+"""
+
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from . import upstream
+
+CANDLE_INTERVAL = "1h"
+CANDLE_SECONDS = 3600
+CANDLE_WINDOW = 24 * 3600     # seconds covered by high_24h / low_24h
+CANDLE_KEEP = 25              # candles kept per asset (window + current)
+CANDLE_SYNC_INTERVAL = 3600   # seconds before an asset's candles are re-synced
+
+# Hyperliquid allows 1200 info weight per minute per IP.  candleSnapshot and
+# both *MetaAndAssetCtxs requests of a market refresh weigh 20 each.
+INFO_WEIGHT_BUDGET = 1200     # per minute
+INFO_REQUEST_WEIGHT = 20
+REFRESH_WEIGHT = 2 * INFO_REQUEST_WEIGHT * 60 / 10  # per minute at engine.CACHE_DURATION
+CANDLE_BUDGET_SHARE = 0.4     # of the budget for the refresh plus candles
+# candleSnapshot requests per second, all workers: 0.2, i.e. 240 weight a
+# minute and 720 syncs per CANDLE_SYNC_INTERVAL, enough for every listing
+CANDLE_RATE = (INFO_WEIGHT_BUDGET * CANDLE_BUDGET_SHARE - REFRESH_WEIGHT) / INFO_REQUEST_WEIGHT / 60
+CANDLE_WORKERS = 2
+CANDLE_IDLE = 5               # seconds to sleep when nothing is due
+
+
+class CandleSeries:
+    """Hourly OHLC for one asset in parallel arrays, oldest first."""
+
+    __slots__ = ("start", "open", "high", "low", "close", "synced_at", "checked_at")
+
+    def __init__(self):
+        self.start = array("q")  # candle open time, seconds
+        self.open = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.close = array("d")
+        self.synced_at = 0       # 0 until candleSnapshot has been merged
+        self.checked_at = 0      # last sync attempt, successful or not
+
+    def __len__(self):
+        return len(self.start)
+
+    def _append(self, start, o, h, l, c):
+        self.start.append(start)
+        self.open.append(o)
+        self.high.append(h)
+        self.low.append(l)
+        self.close.append(c)
+
+    def _trim(self, size=CANDLE_KEEP):
+        extra = len(self.start) - size
+        if extra > 0:
+            for col in (self.start, self.open, self.high, self.low, self.close):
+                del col[:extra]
+
+    def update(self, ts, price):
+        """Fold a live price sampled at `ts` into the current candle."""
+        start = int(ts // CANDLE_SECONDS) * CANDLE_SECONDS
+        if not self.start or start > self.start[-1]:
+            self._append(start, price, price, price, price)
+            self._trim()
+        elif start == self.start[-1]:
+            self.high[-1] = max(self.high[-1], price)
+            self.low[-1] = min(self.low[-1], price)
+            self.close[-1] = price
+
+    def merge(self, candles, ts):
+        """Replace everything from the first of `candles` (a candleSnapshot
+        response) onwards with them."""
+        if candles:
+            first = int(candles[0]["t"]) // 1000
+            keep = sum(1 for s in self.start if s < first)
+            for col in (self.start, self.open, self.high, self.low, self.close):
+                del col[keep:]
+            for c in candles:
+                self._append(int(c["t"]) // 1000, float(c["o"]), float(c["h"]),
+                             float(c["l"]), float(c["c"]))
+            self._trim()
+        self.synced_at = ts
+
+    def range(self, now):
+        """(high, low) over the candles inside the last CANDLE_WINDOW."""
+        cutoff = now - CANDLE_WINDOW
+        first = next((i for i, s in enumerate(self.start) if s > cutoff), len(self.start))
+        if first == len(self.start):
+            return None
+        return max(self.high[first:]), min(self.low[first:])
+
+
+class RateLimiter:
+    """Spaces calls `1 / rate` seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class CandleBook:
+    """Candle series of every listed asset plus the sync loop that fills them."""
+
+    def __init__(self, rate=CANDLE_RATE, workers=CANDLE_WORKERS):
+        self.series = {}  # symbol -> CandleSeries
+        self.coins = {}   # symbol -> Hyperliquid coin name (allMids key)
+        self.order = ()   # symbols in rank order, the sync priority
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def record(self, frame, ts):
+        """Fold a frozen market table's prices into the current candles."""
+        with self._lock:
+            self.order = tuple(frame["symbol"])
+            for symbol, coin, price in zip(frame["symbol"], frame["coin"], frame["price"].tolist()):
+                if price <= 0:
+                    continue
+                series = self.series.get(symbol)
+                if series is None:
+                    series = self.series[symbol] = CandleSeries()
+                series.update(ts, price)
+                self.coins[symbol] = coin
+
+    def ranges(self, symbols, now):
+        """high_24h and low_24h columns for `symbols`; NaN where unsynced."""
+        high = np.full(len(symbols), np.nan)
+        low = np.full(len(symbols), np.nan)
+        with self._lock:
+            for i, symbol in enumerate(symbols):
+                series = self.series.get(symbol)
+                if series is not None and series.synced_at:
+                    r = series.range(now)
+                    if r is not None:
+                        high[i], low[i] = r
+        return high, low
+
+    def _claim(self):
+        """The highest ranked due symbol, marked as being synced, or None."""
+        now = time.time()
+        with self._lock:
+            for symbol in self.order:
+                series = self.series.get(symbol)
+                if series is not None and now - series.checked_at > CANDLE_SYNC_INTERVAL:
+                    series.checked_at = now
+                    return symbol
+        return None
+
+    def sync(self, symbol):
+        """Fetch and merge one asset's candles since its last sync."""
+        with self._lock:
+            series = self.series[symbol]
+            coin = self.coins[symbol]
+            now = series.checked_at = time.time()
+        # From the candle that was still open at the last sync
+        if series.synced_at:
+            since = int(series.synced_at // CANDLE_SECONDS) * CANDLE_SECONDS
+        else:
+            since = now - CANDLE_KEEP * CANDLE_SECONDS
+        self.limiter.wait()
+        candles = upstream._hl_post({"type": "candleSnapshot", "req": {
+            "coin": coin, "interval": CANDLE_INTERVAL,
+            "startTime": int(since * 1000), "endTime": int(now * 1000)}})
+        with self._lock:
+            series.merge(candles or [], now)
+
+    def start(self):
+        """Start the sync workers (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [threading.Thread(target=self._run, name=f"candles-{i}", daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            symbol = self._claim()
+            if symbol is None:
+                time.sleep(CANDLE_IDLE)
+                continue
+            try:
+                self.sync(symbol)
+            except Exception as e:
+                print(f"Error syncing {symbol} candles: {e}")
+
+
+candle_book = CandleBook()
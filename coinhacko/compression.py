@@ -0,0 +1,113 @@
+"""
+Response compression for snapshot bodies.
+
+The encoding is negotiated from Accept-Encoding (brotli when the optional
+`brotli` package is installed, else gzip).  Compressed bytes are kept in
+an LRU keyed by snapshot version plus whatever selected the body (route,
+page, per_page, format, view), so every polling client of a version shares
+one compression; the engine compresses the default pages when it installs
+a snapshot, before anyone asks.
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli  # optional; ~20% smaller than gzip on coin pages
+except ImportError:
+    brotli = None
+
+from .metrics import CACHE_LOOKUPS, COMPRESS_LATENCY
+from .snapshot import SNAPSHOT_PER_PAGE
+
+COMPRESS_MIN_SIZE = 1024     # bytes; smaller bodies are sent as is
+COMPRESSED_CACHE_SIZE = 256  # compressed bodies kept, across versions
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5           # 0-11; higher costs far more time per page
+# Offered encodings, preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """The encoding to send for an Accept-Encoding header, or None.
+
+    Highest q-value among ENCODINGS wins, ties going to ENCODINGS order;
+    q=0 excludes an encoding and "*" covers unnamed ones.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    default = weights.get("*", 0.0)
+    best = max(ENCODINGS, key=lambda e: weights.get(e, default))
+    return best if weights.get(best, default) > 0 else None
+
+
+def compress(body, encoding):
+    """`body` compressed with `encoding` ("br" or "gzip")."""
+    with COMPRESS_LATENCY.time(encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        # mtime=0 so equal bodies give equal bytes
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def page_key(page, per_page, query=None, fmt="json", view=None):
+    """Cache key of a /api/coins page (see Snapshot.page)."""
+    return ("page", page, per_page, query, fmt, view)
+
+
+class CompressedBodies:
+    """LRU of compressed bodies keyed by (version, key, encoding)."""
+
+    def __init__(self, size=COMPRESSED_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version, key, encoding):
+        """The cached compressed body of `key` at `version`, or None."""
+        entry = (version, key, encoding)
+        with self._lock:
+            compressed = self._entries.get(entry)
+            if compressed is not None:
+                self._entries.move_to_end(entry)
+        CACHE_LOOKUPS.inc("compressed", "miss" if compressed is None else "hit")
+        return compressed
+
+    def put(self, version, key, encoding, body):
+        """Compress `body`, the JSON of `key` at `version`, and cache the
+        result unless `key` is None; returns the compressed bytes."""
+        # Concurrent misses may both compress; the results are identical
+        compressed = compress(body, encoding)
+        if key is not None:
+            with self._lock:
+                self._entries[(version, key, encoding)] = compressed
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return compressed
+
+    def precompress(self, snap):
+        """Compress the default /api/coins pages of `snap` in every encoding."""
+        for per_page in SNAPSHOT_PER_PAGE:
+            for page in range(1, max(1, -(-len(snap) // per_page)) + 1):
+                body = snap.page(page, per_page)
+                if len(body) >= COMPRESS_MIN_SIZE:
+                    for encoding in ENCODINGS:
+                        self.put(snap.version, page_key(page, per_page), encoding, body)
+
+
+compressed_bodies = CompressedBodies()
@@ -0,0 +1,17 @@
+"""
+JSON encoding for response bodies.
+"""
+
+import json
+
+try:
+    import orjson  # optional; several times faster at encoding floats
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    """Compact JSON bytes; uses orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode()
@@ -0,0 +1,466 @@
+"""
+Refresh and publish: turns the market table into response snapshots.
+
+The Flask app refreshes on a background schedule (and, in ws mode, from the
+allMids feed); the Vercel function sets BACKGROUND_REFRESH = False and
+refreshes inline on the request that finds the snapshot stale.  With
+COINHACKO_SHARED_STORE set, only the process elected by coinhacko.shared
+refreshes and the others adopt the snapshots it writes, from a follower
+thread so their /api/stream subscribers see every update.
+"""
+
+import bisect
+import itertools
+import os
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from . import bootstrap, liquidations
+from .candles import candle_book
+from .compression import compressed_bodies
+from .encoding import dumps
+from .history import price_history
+from .liquidations import update_liquidations
+from .market import fetch_hyperliquid_data, market_table, table_lock
+from .metrics import CACHE_LOOKUPS, FORMAT_LATENCY, REFRESH_LATENCY, SERIALIZE_LATENCY
+from .shared import SHARED_COLD_WAIT, SharedStore
+from .snapshot import Snapshot
+from .stream import broadcaster, diff_snapshots, encode_stream_update
+from .timeseries import series_store
+from .upstream import market_data
+from .ws import WsIngestor
+
+# Ingestion mode.  "rest" polls the info endpoint every CACHE_DURATION.
+# "ws" applies allMids pushes as they arrive and only takes a REST snapshot
+# every WS_RESYNC_INTERVAL (or when the feed goes quiet) to resync volumes,
+# previous-day prices, listings and OI.
+INGEST_MODE = os.environ.get("INGEST_MODE", "rest")
+WS_RESYNC_INTERVAL = 60     # seconds between REST snapshots in ws mode
+
+CACHE_DURATION = 10  # seconds
+REFRESH_JITTER = 2   # +/- seconds added to each scheduled refresh
+# Liquidations reuse the refresh's metaAndAssetCtxs payload.  In ws mode that
+# is only refetched every WS_RESYNC_INTERVAL, so accept payloads that old
+# (plus jitter and fetch time) rather than fetching one per request.
+if INGEST_MODE == "ws":
+    liquidations.LIQ_CACHE_TTL = max(liquidations.LIQ_CACHE_TTL,
+                                     WS_RESYNC_INTERVAL + 2 * REFRESH_JITTER)
+# False where nothing may run after a response (serverless): stale
+# snapshots are then refreshed inline instead of by the schedule thread.
+BACKGROUND_REFRESH = True
+# True to keep a bootstrap file (coinhacko.bootstrap) for the next cold start
+SAVE_BOOTSTRAP = False
+# Compress the default pages of each new snapshot as it is published
+PRECOMPRESS = True
+
+# Path of a snapshot store shared by the workers on this host (gunicorn -w N):
+# one elected worker refreshes, so upstream load doesn't grow with N.
+SHARED_STORE_PATH = os.environ.get("COINHACKO_SHARED_STORE", "")
+shared_store = SharedStore(SHARED_STORE_PATH) if SHARED_STORE_PATH else None
+_shared_lock = threading.Lock()
+_follower = None  # reader thread adopting the store's snapshots
+
+cache_timestamp = 0
+_bootstrap_saved = 0
+
+# Seeded from the clock in milliseconds so versions keep increasing across
+# restarts (ws mode publishes about once a second, far below one per ms): an
+# ETag or ?since= from a previous process can never match a new snapshot.
+_snapshot_versions = itertools.count(int(time.time() * 1000))
+
+# Swapped in whole by publish(); the empty version-0 snapshot means "cold"
+snapshot = Snapshot()
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+def update_cache():
+    """Refresh the market table from REST and publish a new response snapshot."""
+    with REFRESH_LATENCY.time("fetch"):
+        loaded = fetch_hyperliquid_data()
+    if loaded:
+        publish()
+        print(f"[{datetime.now():%H:%M:%S}] Cache updated: {len(snapshot)} assets "
+              f"(snapshot v{snapshot.version})")
+        if SAVE_BOOTSTRAP:
+            save_bootstrap()
+
+
+def save_bootstrap():
+    """Write the current snapshot as the bootstrap, at most every BOOTSTRAP_SAVE_INTERVAL."""
+    global _bootstrap_saved
+    if not bootstrap.BOOTSTRAP_PATH or time.time() - _bootstrap_saved < bootstrap.BOOTSTRAP_SAVE_INTERVAL:
+        return
+    _bootstrap_saved = time.time()
+    try:
+        with REFRESH_LATENCY.time("bootstrap"):
+            bootstrap.save(snapshot, bootstrap.BOOTSTRAP_PATH)
+    except OSError as e:
+        print(f"Error saving bootstrap snapshot: {e}")
+
+
+def publish():
+    """Freeze the market table and publish everything derived from it."""
+    with table_lock, REFRESH_LATENCY.time("publish"):
+        ts = time.time()
+        frame = market_table.freeze()
+        price_history.record(zip(frame["symbol"], frame["price"].tolist()), ts)
+        candle_book.record(frame, ts)
+        frame["high_24h"], frame["low_24h"] = candle_book.ranges(frame["symbol"], ts)
+        with FORMAT_LATENCY.time("snapshot"):
+            snap = Snapshot(next(_snapshot_versions), ts, frame)
+        _install(snap)
+    precompress(snap)
+    if shared_store is not None and shared_store.leader:
+        entries = {t: market_data[t] for t in ("metaAndAssetCtxs",) if t in market_data}
+        try:
+            with REFRESH_LATENCY.time("shared_write"):
+                shared_store.write(snap, frame, entries)
+        except OSError as e:
+            print(f"Error writing shared snapshot store: {e}")
+
+
+def adopt(stored):
+    """Publish a snapshot read from the shared store (see SharedStore.poll)."""
+    version, ts, frame, sparklines, entries = stored
+    with table_lock, REFRESH_LATENCY.time("shared_read"):
+        market_data.update(entries)
+        # Kept up to date in case this process is elected refresher later
+        price_history.record(zip(frame["symbol"], frame["price"].tolist()), ts)
+        with FORMAT_LATENCY.time("snapshot"):
+            snap = Snapshot(version, ts, frame, sparklines)
+        _install(snap)
+    precompress(snap)
+
+
+def precompress(snap):
+    """Encode and compress the default pages of `snap` (see coinhacko.compression)."""
+    if PRECOMPRESS:
+        with REFRESH_LATENCY.time("compress"):
+            compressed_bodies.precompress(snap)
+
+
+def _install(snap):
+    """Make `snap` current and derive liquidations, perp series, ?since=
+    diffs and the stream update from it."""
+    global cache_timestamp, snapshot
+    previous = snapshot
+    snapshot, cache_timestamp = snap, snap.ts
+    if "metaAndAssetCtxs" in market_data:
+        entry = market_data["metaAndAssetCtxs"]
+        update_liquidations(entry)
+        # Shared-store readers keep series in memory; the refresher writes segments
+        series_store.record(entry, persist=shared_store is None or shared_store.leader)
+    log_checkpoint(snap)
+    broadcaster.publish(encode_stream_update(diff_snapshots(previous, snap)))
+
+
+def apply_mids(mids):
+    """Fold an allMids update into the table and publish if any price moved."""
+    if not market_table:
+        return
+    with table_lock:
+        if market_table.apply_mids(mids):
+            publish()
+
+
+class Refresher:
+    """Runs `refresh` on a jittered schedule with single-flight semantics.
+
+    At most one refresh is ever in flight; callers that ask for one while it
+    is running either join it (`wait=True`) or return immediately.  Works the
+    same under ``app.run`` and threaded WSGI servers: the schedule thread is
+    started lazily by the first request that needs it.
+    """
+
+    def __init__(self, refresh, interval=CACHE_DURATION, jitter=REFRESH_JITTER):
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._inflight = None  # threading.Event while a refresh is running
+        self._thread = None
+
+    @property
+    def refreshing(self):
+        return self._inflight is not None
+
+    def next_delay(self):
+        return max(1.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def refresh_now(self, wait=True):
+        """Refresh, or join the refresh already in flight."""
+        with self._lock:
+            event = self._inflight
+            owner = event is None
+            if owner:
+                event = self._inflight = threading.Event()
+        if not owner:
+            if wait:
+                event.wait()
+            return
+        try:
+            self.refresh()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def trigger(self):
+        """Start a refresh in the background unless one is already running."""
+        if self._inflight is None:
+            threading.Thread(target=self.refresh_now, kwargs={"wait": False},
+                             daemon=True).start()
+
+    def start(self):
+        """Start the schedule thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.next_delay())
+            self.refresh_now(wait=False)
+
+
+refresher = Refresher(update_cache,
+                      interval=WS_RESYNC_INTERVAL if INGEST_MODE == "ws" else CACHE_DURATION)
+ws_ingestor = WsIngestor(apply_mids)
+
+
+def start_background():
+    """Start the refresh schedule, the candle sync and, in ws mode, the
+    WebSocket feed (only in the elected process when there is a shared store;
+    the others follow the store instead)."""
+    if shared_store is not None and not sync_shared_store():
+        start_follower()
+        return
+    refresher.start()
+    candle_book.start()
+    if INGEST_MODE == "ws":
+        ws_ingestor.start()
+
+
+def get_snapshot():
+    """Return the current snapshot without waiting on Hyperliquid.
+
+    Stale-while-revalidate: a stale snapshot is served as-is while a refresh
+    runs in the background (or, without BACKGROUND_REFRESH, inline in this
+    request while concurrent ones keep getting the stale one).  Only a cold
+    process with nothing to serve blocks, and concurrent cold requests share
+    that one fetch.
+    """
+    if shared_store is not None and not sync_shared_store():
+        if BACKGROUND_REFRESH:
+            start_follower()
+        CACHE_LOOKUPS.inc("snapshot", "hit" if snapshot.version else "miss")
+        return snapshot
+    if BACKGROUND_REFRESH:
+        start_background()
+    if not snapshot.version:
+        CACHE_LOOKUPS.inc("snapshot", "miss")
+        refresher.refresh_now(wait=True)
+    elif time.time() - cache_timestamp > CACHE_DURATION + REFRESH_JITTER:
+        CACHE_LOOKUPS.inc("snapshot", "stale")
+        if BACKGROUND_REFRESH:
+            refresher.trigger()
+        else:
+            refresher.refresh_now(wait=False)
+    else:
+        CACHE_LOOKUPS.inc("snapshot", "hit")
+    return snapshot
+
+
+def sync_shared_store():
+    """Adopt the shared store's newest snapshot, waiting up to
+    SHARED_COLD_WAIT while there is none yet.
+
+    Returns True once this process is the elected refresher, which then
+    refreshes like a standalone one.
+    """
+    global _snapshot_versions
+    if shared_store.leader:
+        return True
+    deadline = time.time() + SHARED_COLD_WAIT
+    while True:
+        # Warm readers don't queue behind another thread's adopt()
+        if _shared_lock.acquire(blocking=not snapshot.version):
+            try:
+                stored = shared_store.poll()
+                if shared_store.leader:
+                    # Carry on from the previous writer's versions
+                    _snapshot_versions = itertools.count(
+                        max(next(_snapshot_versions), shared_store.version + 1))
+                    print(f"Elected shared store refresher (pid {os.getpid()})")
+                    return True
+                if stored is not None:
+                    adopt(stored)
+            finally:
+                _shared_lock.release()
+        if snapshot.version or time.time() > deadline:
+            return False
+        time.sleep(shared_store.poll_interval)
+
+
+def start_follower():
+    """Start the reader thread that adopts each stored snapshot as it
+    appears (idempotent), so /api/stream subscribers get updates without
+    waiting for a REST request; it starts refreshing once elected."""
+    global _follower
+    with _shared_lock:
+        if _follower is not None:
+            return
+        _follower = threading.Thread(target=_follow_shared_store, daemon=True)
+    _follower.start()
+
+
+def _follow_shared_store():
+    while True:
+        try:
+            if sync_shared_store():
+                break
+        except Exception:
+            traceback.print_exc()
+        time.sleep(shared_store.poll_interval)
+    start_background()
+
+
+def get_formatted_coins():
+    """Return the coin list formatted for the frontend."""
+    return get_snapshot().coins()
+
+
+def status():
+    """Body of /api/status."""
+    return {
+        "status": "online",
+        "source": "Hyperliquid DEX",
+        "cache_age": time.time() - cache_timestamp if cache_timestamp > 0 else None,
+        "cached_coins": len(market_table),
+        "snapshot_version": snapshot.version,
+        "refreshing": refresher.refreshing,
+        "stream_subscribers": len(broadcaster),
+        "ingest": INGEST_MODE,
+        "ws_connected": ws_ingestor.connected if INGEST_MODE == "ws" else None,
+        "shared_store": None if shared_store is None else {
+            "path": shared_store.path,
+            "role": "refresher" if shared_store.leader else "reader",
+            "version": shared_store.version,
+        },
+        "last_update": datetime.fromtimestamp(cache_timestamp).isoformat() if cache_timestamp > 0 else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Incremental polling (/api/coins?since=<version>)
+# ---------------------------------------------------------------------------
+# Fields compared between versions; the sparkline is left out as its last
+# point moves on every refresh.
+DELTA_FIELDS = ("current_price", "market_cap_rank", "price_change_percentage_24h",
+                "market_cap", "total_volume", "high_24h", "low_24h",
+                "circulating_supply")
+CHANGELOG_WINDOW = 900  # seconds of versions ?since= can start from
+CHANGELOG_RECENT = 60   # of which every version; older ones one per CACHE_DURATION
+
+
+class Checkpoint:
+    """The columns of a published snapshot, without its memoized encodings.
+
+    Arrays are shared with the snapshot, and whatever didn't change since
+    `previous` (the universe and, between ws resyncs, volume, rank and
+    supply) with that checkpoint, so per-second versions stay cheap.
+    """
+
+    __slots__ = ("version", "ts", "ids", "index", "columns")
+
+    def __init__(self, snap, previous=None):
+        self.version = snap.version
+        self.ts = snap.ts
+        self.ids, self.index, self.columns = snap.ids, snap.index, dict(snap.columns)
+        if previous is not None and previous.ids == snap.ids:
+            self.ids, self.index = previous.ids, previous.index
+            for field, col in previous.columns.items():
+                if np.array_equal(col, self.columns[field]):
+                    self.columns[field] = col
+
+
+# Checkpoints ?since= can start from, oldest first and sized by time, as ws
+# mode publishes every second: every version of the last CHANGELOG_RECENT
+# seconds (covers polling clients), then one per CACHE_DURATION back to
+# CHANGELOG_WINDOW.  Older or thinned-out versions get a full page.
+recent_log = deque()
+change_log = deque()
+
+# since -> encoded delta, valid for one snapshot version
+delta_cache = {"version": 0, "bodies": {}}
+_delta_lock = threading.Lock()
+
+
+def log_checkpoint(snap):
+    """Add `snap` to the change log and age out old checkpoints."""
+    recent_log.append(Checkpoint(snap, recent_log[-1] if recent_log else None))
+    while recent_log[0].ts < snap.ts - CHANGELOG_RECENT:
+        old = recent_log.popleft()
+        if not change_log or old.ts >= change_log[-1].ts + CACHE_DURATION:
+            change_log.append(old)
+    while change_log and change_log[0].ts < snap.ts - CHANGELOG_WINDOW:
+        change_log.popleft()
+
+
+def find_checkpoint(version):
+    """The logged checkpoint of `version`, or None."""
+    for log in (recent_log, change_log):
+        log = tuple(log)  # the refresh thread appends and pops meanwhile
+        i = bisect.bisect_left(log, version, key=lambda c: c.version)
+        if i < len(log) and log[i].version == version:
+            return log[i]
+    return None
+
+
+def encode_delta(snap, since):
+    """Encode every change between version `since` and `snap`.
+
+    Returns None when `since` can't be served incrementally (too old,
+    from the future, or from before a restart); callers send a full page.
+    """
+    global delta_cache
+    with _delta_lock:
+        if delta_cache["version"] != snap.version:
+            delta_cache = {"version": snap.version, "bodies": {}}
+        cache = delta_cache
+    body = cache["bodies"].get(since)
+    if body is not None:
+        CACHE_LOOKUPS.inc("delta", "hit")
+        return body
+    CACHE_LOOKUPS.inc("delta", "miss")
+
+    base = find_checkpoint(since)
+    if base is None or since > snap.version:
+        return None
+
+    # One diff against the client's version covers everything in between
+    diff = diff_snapshots(base, snap, DELTA_FIELDS)
+    added_coins = [snap.coin(snap.index[i]) for i in diff["added"]]
+    with SERIALIZE_LATENCY.time("delta"):
+        body = dumps({
+            "version": snap.version,
+            "since": since,
+            "changed": diff["changed"],
+            "added": added_coins,
+            "removed": sorted(diff["removed"]),
+            "total": len(snap),
+        })
+    cache["bodies"][since] = body
+    return body
@@ -0,0 +1,200 @@
+"""
+Framework-neutral route handlers.
+
+Each takes the query args as a str -> str mapping (first value per key)
+and returns (status, body bytes, headers); app.py and api/index.py only
+map their request objects onto these and write the result out.
+"""
+
+import json
+
+from . import engine
+from .compression import COMPRESS_MIN_SIZE, compressed_bodies, negotiate, page_key
+from .encoding import dumps
+from .liquidations import estimate_liquidations, liquidation_heatmap, parse_heatmap_params
+from .metrics import SERIALIZE_LATENCY, render_metrics
+from .snapshot import BATCH_MAX_IDS, PAGE_FORMATS, parse_coin_query, parse_page, parse_view
+from .timeseries import parse_history_params, series_store
+
+JSON = "application/json"
+
+
+def _json(data, status=200):
+    return status, dumps(data), {"Content-Type": JSON}
+
+
+def _int_arg(args, name, default):
+    """Integer query arg; `default` when absent or malformed."""
+    try:
+        return int(args[name]) if name in args else default
+    except ValueError:
+        return default
+
+
+def _not_modified(if_none_match, etag):
+    """304 if If-None-Match (weak comparison) names `etag`, else None."""
+    tags = {t.strip().removeprefix("W/") for t in (if_none_match or "").split(",")}
+    if f'"{etag}"' in tags or "*" in tags:
+        return 304, b"", {"ETag": f'"{etag}"'}
+    return None
+
+
+def _snapshot_body(snap, encode, key=None, accept_encoding=None):
+    """200 for the JSON of `snap` that `encode()` returns, compressed if
+    Accept-Encoding allows.
+
+    `key` names the body in the compressed cache (None: don't cache); a
+    cached compressed body is sent without calling `encode`.  Compressed
+    bodies carry a weak ETag, as they aren't the same bytes.
+    """
+    headers = {"Content-Type": JSON, "ETag": f'"{snap.etag}"', "Cache-Control": "no-cache",
+               "Vary": "Accept-Encoding"}
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return 200, encode(), headers
+    body = compressed_bodies.get(snap.version, key, encoding) if key is not None else None
+    if body is None:
+        body = encode()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return 200, body, headers
+        body = compressed_bodies.put(snap.version, key, encoding, body)
+    headers["Content-Encoding"] = encoding
+    headers["ETag"] = f'W/"{snap.etag}"'
+    return 200, body, headers
+
+
+def coins(args, if_none_match=None, accept_encoding=None):
+    """/api/coins: a page of the ranked list, or a delta with ?since=.
+    ?fields=, ?sparkline= and ?precision= shape each coin (see parse_view)."""
+    snap = engine.get_snapshot()
+    try:
+        query = parse_coin_query(args)
+        view = parse_view(args)
+        page, per_page = parse_page(args)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    fmt = args.get("format", "json")
+    if fmt not in PAGE_FORMATS:
+        return _json({"error": "format must be json or compact"}, 400)
+    not_modified = _not_modified(if_none_match, snap.etag)
+    if not_modified:
+        return not_modified
+
+    # ?since=<version>: only what changed after that version, if still logged.
+    # Deltas cover the whole list and every field, so sorted, filtered or
+    # projected queries get pages.
+    since = _int_arg(args, "since", None)
+    if since is not None and query is None and view is None:
+        body = engine.encode_delta(snap, since)
+        if body is not None:
+            return _snapshot_body(snap, lambda: body, ("since", since), accept_encoding)
+
+    return _snapshot_body(snap, lambda: snap.page(page, per_page, query, fmt, view),
+                          page_key(page, per_page, query, fmt, view), accept_encoding)
+
+
+def coin_detail(coin_id, args, if_none_match=None, accept_encoding=None):
+    """/api/coin/<coin_id>: one coin by id, symbol or alias, shaped by
+    ?fields=, ?sparkline= and ?precision=."""
+    snap = engine.get_snapshot()
+    try:
+        view = parse_view(args)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    coin_id = snap.resolve(coin_id)
+    if coin_id is None:
+        return _json({"error": "Coin not found"}, 404)
+    return (_not_modified(if_none_match, snap.etag)
+            or _snapshot_body(snap, lambda: snap.detail(coin_id, view), ("coin", coin_id, view),
+                              accept_encoding))
+
+
+def _batch_params(args, body):
+    """(ids, view) from ?ids= or a JSON body {"ids": [...], "fields": "a,b"
+    or [...]}, plus the parse_view args; raises ValueError with a client
+    message."""
+    if body is not None:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise ValueError("body must be JSON")
+        if not isinstance(data, dict) or not isinstance(data.get("ids"), list) \
+                or not all(isinstance(i, str) for i in data["ids"]):
+            raise ValueError('body must be {"ids": ["btc", ...]}')
+        ids = data["ids"]
+        fields = data.get("fields", args.get("fields"))
+        if isinstance(fields, list):
+            fields = ",".join(map(str, fields))
+        args = {k: v for k, v in args.items() if k in ("sparkline", "precision")}
+        if isinstance(fields, str):
+            args["fields"] = fields
+    else:
+        ids = args.get("ids", "").split(",")
+    ids = [i.strip() for i in ids if i.strip()]
+    if not ids:
+        raise ValueError("ids is required")
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f"at most {BATCH_MAX_IDS} ids per request")
+    return ids, parse_view(args)
+
+
+def coins_batch(args, body=None, if_none_match=None, accept_encoding=None):
+    """/api/coins/batch: many coins by id, symbol or alias (?ids=btc,eth, or
+    a POST `body` for long lists), shaped like coin_detail."""
+    snap = engine.get_snapshot()
+    try:
+        ids, view = _batch_params(args, body)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    return (_not_modified(if_none_match, snap.etag)
+            or _snapshot_body(snap, lambda: snap.batch(ids, view), None, accept_encoding))
+
+
+def coin_history(coin_id, args):
+    """/api/coin/<coin_id>/history: field (funding, open_interest, premium,
+    oracle_price), res (1m, 1h, 1d), limit."""
+    snap = engine.get_snapshot()
+    coin_id = snap.resolve(coin_id)
+    if coin_id is None:
+        return _json({"error": "Coin not found"}, 404)
+    try:
+        field, res, limit = parse_history_params(args)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    symbol = snap.symbols[snap.index[coin_id]]
+    points = series_store.query(symbol, field, res, limit)
+    if points is None:
+        return _json({"error": "No history for this coin (perps only)"}, 404)
+    with SERIALIZE_LATENCY.time("history"):
+        return _json({"id": coin_id, "symbol": symbol, "field": field, "res": res,
+                      "points": points})
+
+
+def liquidations(args):
+    """/api/liquidations: levels for ?symbols= (ALL for every perp)."""
+    symbols = args.get("symbols", "BTC,ETH,SOL")
+    results = estimate_liquidations(tuple(s.strip().upper() for s in symbols.split(",")))
+    with SERIALIZE_LATENCY.time("liquidations"):
+        return 200, dumps(results), {"Content-Type": JSON}
+
+
+def heatmap(args):
+    """/api/liquidations/heatmap: symbol, bins, range (+/- %), lev (leverage:weight,...)."""
+    try:
+        params = parse_heatmap_params(args)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    body = liquidation_heatmap(*params)
+    if body is None:
+        return _json({"error": "Symbol not found"}, 404)
+    return 200, body, {"Content-Type": JSON}
+
+
+def status():
+    """/api/status."""
+    return _json(engine.status())
+
+
+def metrics():
+    """/metrics: Prometheus scrape endpoint."""
+    return 200, render_metrics(), {"Content-Type": "text/plain; version=0.0.4"}
@@ -0,0 +1,104 @@
+"""
+Per-symbol price history in fixed-size ring buffers (sparklines).
+"""
+
+import threading
+import time
+from array import array
+
+# tier -> (bucket width in seconds, number of buckets)
+HISTORY_TIERS = {
+    "hourly": (3600, 168),    # 7d sparkline
+    "intraday": (300, 288),   # last 24h at 5 minute resolution
+}
+SPARKLINE_POINTS = 168
+
+
+class RingBuffer:
+    """Fixed-size ring of time-bucketed doubles.
+
+    Each bucket holds the last value recorded in it, so the newest bucket
+    always tracks the live price.  Buckets skipped between samples carry the
+    previous value forward.
+    """
+
+    __slots__ = ("width", "size", "values", "last_bucket", "count")
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.values = array("d", bytes(8 * size))
+        self.last_bucket = None
+        self.count = 0
+
+    def record(self, ts, value):
+        bucket = int(ts // self.width)
+        last = self.last_bucket
+        if last is None:
+            self.count = 1
+        elif bucket < last:
+            return  # out-of-order sample
+        elif bucket > last:
+            prev = self.values[last % self.size]
+            for b in range(max(last + 1, bucket - self.size + 1), bucket):
+                self.values[b % self.size] = prev
+            self.count = min(self.count + bucket - last, self.size)
+        self.values[bucket % self.size] = value
+        self.last_bucket = bucket
+
+    def series(self, points=None):
+        """Return the buffer oldest-first as an array, keeping at most `points`."""
+        if not self.count:
+            return array("d")
+        end = self.last_bucket % self.size + 1
+        start = end - self.count
+        if start >= 0:
+            out = self.values[start:end]
+        else:
+            out = self.values[start:] + self.values[:end]
+        if points and len(out) > points:
+            # Stride from the newest point backwards so it is always kept
+            step = -(-len(out) // points)
+            out = out[(len(out) - 1) % step::step]
+        return out
+
+
+class PriceHistory:
+    """Per-symbol mid price history across all HISTORY_TIERS."""
+
+    def __init__(self, tiers=HISTORY_TIERS):
+        self.tiers = tiers
+        self._buffers = {}  # symbol -> {tier: RingBuffer}
+        self._lock = threading.Lock()
+
+    def record(self, prices, ts=None):
+        """Record an iterable of (symbol, price) pairs sampled at `ts`."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for symbol, price in prices:
+                if price <= 0:
+                    continue
+                tiers = self._buffers.get(symbol)
+                if tiers is None:
+                    tiers = self._buffers[symbol] = {
+                        name: RingBuffer(width, size)
+                        for name, (width, size) in self.tiers.items()
+                    }
+                for buf in tiers.values():
+                    buf.record(ts, price)
+
+    def sparkline(self, symbol, points=SPARKLINE_POINTS):
+        """Hourly series for `symbol`, falling back to intraday while the
+        hourly tier has fewer than two buckets (e.g. right after startup)."""
+        tiers = self._buffers.get(symbol)
+        if tiers is None:
+            return array("d")
+        hourly = tiers["hourly"]
+        if hourly.count >= 2:
+            return hourly.series(points)
+        return tiers["intraday"].series(points)
+
+
+# Lives as long as the process (or warm Vercel instance); a cold start
+# begins with empty history.
+price_history = PriceHistory()
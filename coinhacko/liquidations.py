@@ -0,0 +1,310 @@
+"""
+Liquidation level estimates and heatmaps for every perp, derived from the
+shared metaAndAssetCtxs payload.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from .encoding import dumps
+from .metrics import CACHE_LOOKUPS, SERIALIZE_LATENCY
+from .upstream import get_market_data
+
+# ---------------------------------------------------------------------------
+# Liquidation Level Estimator
+# ---------------------------------------------------------------------------
+LIQUIDATION_THRESHOLD = 50_000_000  # $50M "pain" threshold
+MAINT_MARGIN = 0.005  # ~0.5% maintenance margin on Hyperliquid
+
+# Assumed distribution of OI across leverage tiers (heuristic)
+BASE_LEVERAGE_DIST = {
+    2: 0.10, 3: 0.12, 5: 0.18, 10: 0.25,
+    15: 0.15, 20: 0.10, 25: 0.05, 40: 0.05,
+}
+
+# Only levels within this distance of the oracle price are listed
+LIQ_MAX_DISTANCE_PCT = 10
+# Majority side = net direction (sign of funding); the minority gets the rest
+LIQ_MAJORITY_SHARE = 0.70
+
+# Per-payload liquidation matrix for every perp.  Per-symbol result dicts are
+# only materialized (and memoized) when a symbol is actually requested.
+liq_cache = {"matrix": None, "ctxs": [], "index": {}, "results": {}, "order": (),
+             "source_ts": 0}
+_liq_lock = threading.Lock()
+LIQ_CACHE_TTL = 30  # seconds; max age of the shared perp payload (engine widens it in ws mode)
+
+
+def _column(ctxs, key, default=None):
+    """Parse one numeric field of every asset ctx into a float64 array."""
+    if default is None:
+        return np.fromiter((float(c.get(key) or 0) for c in ctxs), float, len(ctxs))
+    return np.fromiter((float(c.get(key) or d) for c, d in zip(ctxs, default)),
+                       float, len(ctxs))
+
+
+def compute_liquidation_matrix(perp_meta, perp_ctxs, lev_dist=BASE_LEVERAGE_DIST):
+    """Estimate liquidation levels for the whole perp universe in one pass.
+
+    Every array is shaped (markets,) or (markets, tiers), where tiers are
+    the leverages of `lev_dist` ordered nearest-first (highest leverage
+    first), which is also the order levels are listed in.
+    """
+    n = min(len(perp_meta), len(perp_ctxs))
+    meta, ctxs = perp_meta[:n], perp_ctxs[:n]
+
+    oracle = _column(ctxs, "oraclePx")
+    oi_coins = _column(ctxs, "openInterest")
+    funding = _column(ctxs, "funding")
+    mid = _column(ctxs, "midPx", default=oracle)
+    max_lev = np.fromiter((m["maxLeverage"] for m in meta), float, n)
+
+    leverage = np.array(sorted(lev_dist, reverse=True), dtype=float)
+    weight = np.array([lev_dist[k] for k in sorted(lev_dist, reverse=True)])
+    liq_distance = (1 / leverage) * (1 - MAINT_MARGIN)
+    distance_pct = liq_distance * 100
+
+    # Leverage distribution capped at each market's max leverage, renormalized
+    allowed = leverage[None, :] <= max_lev[:, None]
+    w = np.where(allowed, weight[None, :], 0.0)
+    total_w = np.cumsum(w[:, ::-1], axis=1)[:, -1:]  # sequential, low lev first
+    pct_of_oi = np.divide(w, total_w, out=np.zeros_like(w), where=total_w > 0)
+
+    valid = (oracle > 0) & (oi_coins > 0)
+    oi_usd = oi_coins * oracle
+    long_share = np.where(funding >= 0, LIQ_MAJORITY_SHARE, 1 - LIQ_MAJORITY_SHARE)
+    tier_oi = oi_usd[:, None] * pct_of_oi
+    long_amount = tier_oi * long_share[:, None]
+    short_amount = tier_oi * (1 - long_share)[:, None]
+
+    listed = allowed & (distance_pct <= LIQ_MAX_DISTANCE_PCT)[None, :]
+
+    # "Next big liquidation": nearest listed tier at or above the threshold
+    def nearest_big(amount):
+        big = listed & (np.rint(amount) >= LIQUIDATION_THRESHOLD)
+        return np.where(big.any(axis=1), big.argmax(axis=1), -1)
+
+    return {
+        "meta": meta,
+        "valid": valid,
+        "oracle": oracle,
+        "mid": mid,
+        "funding": funding,
+        "oi_usd": oi_usd,
+        "leverage": leverage,
+        "distance_pct": distance_pct,
+        "allowed": allowed,
+        "listed": listed,
+        "long_price": oracle[:, None] * (1 - liq_distance)[None, :],
+        "short_price": oracle[:, None] * (1 + liq_distance)[None, :],
+        "long_amount": long_amount,
+        "short_amount": short_amount,
+        "next_below": nearest_big(long_amount),
+        "next_above": nearest_big(short_amount),
+    }
+
+
+def _liquidation_result(matrix, i):
+    """Materialize the API dict for market row `i` of a liquidation matrix."""
+    market = matrix["meta"][i]
+    levels = []
+    next_big = {}
+    for t in np.flatnonzero(matrix["listed"][i]):
+        leverage = int(matrix["leverage"][t])
+        distance_pct = round(float(matrix["distance_pct"][t]), 2)
+        for side, direction, price, amount, nearest in (
+            ("LONG", "below", "long_price", "long_amount", "next_below"),    # longs liquidate on drops
+            ("SHORT", "above", "short_price", "short_amount", "next_above"),  # shorts on rises
+        ):
+            level = {
+                "side": side,
+                "leverage": leverage,
+                "liq_price": round(float(matrix[price][i, t]), 2),
+                "distance_pct": distance_pct,
+                "amount_at_risk": round(float(matrix[amount][i, t])),
+                "direction": direction,
+            }
+            levels.append(level)
+            if matrix[nearest][i] == t:
+                next_big[direction] = level
+
+    return {
+        "symbol": market["name"],
+        "price": float(matrix["mid"][i]),
+        "oracle_price": float(matrix["oracle"][i]),
+        "open_interest_usd": round(float(matrix["oi_usd"][i])),
+        "funding_rate": float(matrix["funding"][i]),
+        "net_direction": "LONG" if matrix["funding"][i] >= 0 else "SHORT",
+        "max_leverage": market["maxLeverage"],
+        "levels": levels,
+        "next_big_liq_below": next_big.get("below"),
+        "next_big_liq_above": next_big.get("above"),
+        "threshold": LIQUIDATION_THRESHOLD,
+    }
+
+
+def update_liquidations(entry):
+    """Build the liquidation matrix for a metaAndAssetCtxs store entry.
+
+    A no-op if the cache was already built from this entry.
+    """
+    global liq_cache
+    with _liq_lock:
+        if liq_cache["source_ts"] == entry["ts"]:
+            return liq_cache
+        matrix = compute_liquidation_matrix(entry["data"][0]["universe"], entry["data"][1])
+        index = {m["name"].upper(): i for i, m in enumerate(matrix["meta"])
+                 if matrix["valid"][i]}
+        liq_cache = {"matrix": matrix, "ctxs": entry["data"][1], "index": index,
+                     "results": {}, "order": tuple(index), "source_ts": entry["ts"]}
+        return liq_cache
+
+
+def estimate_liquidations(symbols=("BTC", "ETH", "SOL")):
+    """Estimate liquidation levels for given perp symbols ("ALL" for every perp)."""
+    # Reuse the coin pipeline's payload if it is recent enough
+    cache = update_liquidations(get_market_data("metaAndAssetCtxs", LIQ_CACHE_TTL))
+    if "ALL" in symbols:
+        symbols = cache["order"]
+    else:
+        # Each listed perp once, in universe order, whatever the request repeats
+        symbols = sorted(set(symbols).intersection(cache["index"]), key=cache["index"].get)
+    results = cache["results"]
+    out = []
+    built = 0
+    for symbol in symbols:
+        result = results.get(symbol)
+        if result is None:
+            i = cache["index"].get(symbol)
+            if i is None:
+                continue
+            result = results[symbol] = _liquidation_result(cache["matrix"], i)
+            built += 1
+        out.append(result)
+    CACHE_LOOKUPS.inc("liquidations", "hit", amount=len(out) - built)
+    CACHE_LOOKUPS.inc("liquidations", "miss", amount=built)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Liquidation heatmap
+# ---------------------------------------------------------------------------
+HEATMAP_DEFAULT_BINS = 400
+HEATMAP_MIN_BINS = 10
+HEATMAP_MAX_BINS = 1000
+HEATMAP_DEFAULT_RANGE = 10   # +/- % around the oracle price
+HEATMAP_MAX_RANGE = 50
+HEATMAP_MAX_LEVERAGE = 200   # ?lev= tiers; Hyperliquid perps cap out at 50x
+# Each tier's liquidations are spread as a normal curve around its level,
+# sigma = HEATMAP_SPREAD * distance from the oracle (entries aren't all at
+# the current price).
+HEATMAP_SPREAD = 0.25
+HEATMAP_CACHE_SIZE = 256
+
+# (symbol, bins, range_pct, lev_dist) -> encoded JSON, for one perp payload
+heatmap_cache = {"source_ts": 0, "bodies": {}}
+_heatmap_lock = threading.Lock()
+
+
+def parse_heatmap_params(args):
+    """Validate heatmap query args; raises ValueError with a client message."""
+    symbol = (args.get("symbol") or "BTC").strip().upper()
+    try:
+        bins = int(args.get("bins", HEATMAP_DEFAULT_BINS))
+        range_pct = float(args.get("range", HEATMAP_DEFAULT_RANGE))
+    except ValueError:
+        raise ValueError("bins and range must be numeric")
+    if not HEATMAP_MIN_BINS <= bins <= HEATMAP_MAX_BINS:
+        raise ValueError(f"bins must be between {HEATMAP_MIN_BINS} and {HEATMAP_MAX_BINS}")
+    if not 0 < range_pct <= HEATMAP_MAX_RANGE:
+        raise ValueError(f"range must be in (0, {HEATMAP_MAX_RANGE}]")
+
+    lev_dist = BASE_LEVERAGE_DIST
+    if args.get("lev"):
+        # lev=2:0.1,5:0.3,10:0.6  (leverage:weight, weights are renormalized)
+        try:
+            lev_dist = {}
+            for part in args["lev"].split(","):
+                leverage, weight = part.split(":")
+                lev_dist[int(leverage)] = float(weight)
+        except ValueError:
+            raise ValueError("lev must look like 2:0.1,5:0.3,10:0.6")
+        weights = lev_dist.values()
+        if (not lev_dist or min(lev_dist) < 1 or max(lev_dist) > HEATMAP_MAX_LEVERAGE
+                or not all(math.isfinite(w) and w >= 0 for w in weights)
+                or not 0 < sum(weights) < math.inf):
+            raise ValueError(f"lev needs leverages from 1 to {HEATMAP_MAX_LEVERAGE} and finite, "
+                             "non-negative weights with a positive total")
+    return symbol, bins, range_pct, lev_dist
+
+
+def _heatmap_curve(centers, width, oracle, prices, amounts, allowed):
+    """Sum each allowed tier's normal curve over the bin centers."""
+    sigma = np.abs(prices - oracle) * HEATMAP_SPREAD
+    z = (centers[None, :] - prices[:, None]) / sigma[:, None]
+    mass = np.exp(-0.5 * z * z) * (width / (sigma * np.sqrt(2 * np.pi)))[:, None]
+    return (amounts[:, None] * mass)[allowed].sum(axis=0)
+
+
+def liquidation_heatmap(symbol, bins=HEATMAP_DEFAULT_BINS,
+                        range_pct=HEATMAP_DEFAULT_RANGE, lev_dist=BASE_LEVERAGE_DIST):
+    """Encoded heatmap for one perp, or None if the symbol has no OI.
+
+    Amounts at risk per price bin for longs and shorts over
+    oracle +/- range_pct, as flat integer arrays.
+    """
+    global heatmap_cache
+    cache = update_liquidations(get_market_data("metaAndAssetCtxs", LIQ_CACHE_TTL))
+    key = (symbol, bins, range_pct, tuple(sorted(lev_dist.items())))
+    with _heatmap_lock:
+        if heatmap_cache["source_ts"] != cache["source_ts"]:
+            heatmap_cache = {"source_ts": cache["source_ts"], "bodies": {}}
+        body = heatmap_cache["bodies"].get(key)
+    CACHE_LOOKUPS.inc("heatmap", "miss" if body is None else "hit")
+    if body is not None:
+        return body
+
+    i = cache["index"].get(symbol)
+    if i is None:
+        return None
+    matrix = cache["matrix"]
+    if lev_dist is not BASE_LEVERAGE_DIST:
+        matrix = compute_liquidation_matrix(matrix["meta"][i:i + 1],
+                                            cache["ctxs"][i:i + 1], lev_dist)
+        i = 0
+
+    oracle = matrix["oracle"][i]
+    lo, hi = oracle * (1 - range_pct / 100), oracle * (1 + range_pct / 100)
+    edges = np.linspace(lo, hi, bins + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    width = edges[1] - edges[0]
+    allowed = matrix["allowed"][i]
+    longs = _heatmap_curve(centers, width, oracle, matrix["long_price"][i],
+                           matrix["long_amount"][i], allowed)
+    shorts = _heatmap_curve(centers, width, oracle, matrix["short_price"][i],
+                            matrix["short_amount"][i], allowed)
+
+    with SERIALIZE_LATENCY.time("heatmap"):
+        body = dumps({
+            "symbol": matrix["meta"][i]["name"],
+            "price": float(matrix["mid"][i]),
+            "oracle_price": float(oracle),
+            "range_pct": range_pct,
+            "bins": bins,
+            "price_min": float(lo),
+            "price_max": float(hi),
+            "bin_width": float(width),
+            "leverage_dist": {str(k): v for k, v in sorted(lev_dist.items())},
+            "long": np.rint(longs).astype(np.int64).tolist(),
+            "short": np.rint(shorts).astype(np.int64).tolist(),
+        })
+
+    with _heatmap_lock:
+        bodies = heatmap_cache["bodies"]
+        if heatmap_cache["source_ts"] == cache["source_ts"]:
+            if len(bodies) >= HEATMAP_CACHE_SIZE:
+                bodies.pop(next(iter(bodies)))  # evict oldest
+            bodies[key] = body
+    return body
@@ -0,0 +1,254 @@
+"""
+Ingestion: Hyperliquid payloads merged into a columnar market table.
+"""
+
+import sys
+import threading
+import traceback
+
+import numpy as np
+
+from .reference import BRIDGED_TOKEN_MAP, COIN_REF, SPOT_MIN_VOLUME
+from .upstream import fetch_market_data
+
+# ---------------------------------------------------------------------------
+# Market table
+# ---------------------------------------------------------------------------
+class MarketTable:
+    """Columnar store of every listed asset, updated in place.
+
+    One row per symbol for the life of the process: numbers live in parallel
+    float64 columns and an asset that drops out of the payload just stops
+    being live, so a refresh overwrites values instead of rebuilding dicts.
+    Mutated only under table_lock; snapshots read a frozen copy.
+    """
+
+    COLUMNS = ("price", "prev_price", "change_24h", "volume", "market_cap",
+               "open_interest", "funding")
+
+    def __init__(self, capacity=512):
+        self.symbols = []    # row -> interned symbol
+        self.names = []
+        self.types = []
+        self.mid_keys = []   # row -> key in the allMids WebSocket feed
+        self.rows = {}       # symbol -> row
+        self.mid_rows = {}   # mid key -> row
+        self.cols = {name: np.zeros(capacity) for name in self.COLUMNS}
+        self.live = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.live))
+
+    def _grow(self, capacity):
+        pad = capacity - len(self.live)
+        self.cols = {name: np.concatenate((col, np.zeros(pad))) for name, col in self.cols.items()}
+        self.live = np.concatenate((self.live, np.zeros(pad, dtype=bool)))
+
+    def _row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            symbol = sys.intern(symbol)
+            self.symbols.append(symbol)
+            self.names.append(symbol)
+            self.types.append("perp")
+            self.mid_keys.append(None)
+            self.rows[symbol] = row
+        return row
+
+    def merge(self, rows):
+        """Load one refresh worth of `rows` and make them the live set.
+
+        Each row is (symbol, name, type, mid_key, price, prev_price, volume,
+        market_cap, open_interest, funding); assets not in `rows` stop being
+        live until they reappear.
+        """
+        needed = len(self.symbols) + sum(1 for r in rows if r[0] not in self.rows)
+        if needed > len(self.live):
+            self._grow(max(needed, 2 * len(self.live)))
+        idx = []
+        for symbol, name, kind, mid_key, *_ in rows:
+            row = self._row(symbol)
+            self.names[row] = name
+            self.types[row] = kind
+            if self.mid_keys[row] != mid_key:
+                self.mid_rows.pop(self.mid_keys[row], None)
+                self.mid_keys[row] = mid_key
+                self.mid_rows[mid_key] = row
+            idx.append(row)
+        idx = np.array(idx, dtype=np.intp)
+        cols = self.cols
+        for i, name in enumerate(("price", "prev_price", "volume", "market_cap",
+                                  "open_interest", "funding"), start=4):
+            cols[name][idx] = [r[i] for r in rows]
+        cols["change_24h"][idx] = [_pct_change(r[4], r[5]) for r in rows]
+        self.live[:] = False
+        self.live[idx] = True
+
+    def apply_mids(self, mids):
+        """Fold an allMids update into the live rows and return how many moved.
+
+        24h change and market cap are rescaled from the new mid.
+        """
+        price = self.cols["price"]
+        idx, px = [], []
+        for key, raw in mids.items():
+            row = self.mid_rows.get(key)
+            if row is None or not self.live[row]:
+                continue
+            new = float(raw) if raw else 0
+            if new > 0 and new != price[row]:
+                idx.append(row)
+                px.append(new)
+        if not idx:
+            return 0
+        idx = np.array(idx, dtype=np.intp)
+        new = np.array(px)
+        old = price[idx]
+        cap = self.cols["market_cap"]
+        cap[idx] = np.divide(cap[idx] * new, old, out=np.zeros(len(idx)), where=old > 0)
+        prev = self.cols["prev_price"][idx].tolist()
+        self.cols["change_24h"][idx] = [_pct_change(p, q) for p, q in zip(px, prev)]
+        price[idx] = new
+        return len(idx)
+
+    def freeze(self):
+        """Copy the live rows out, ranked by market cap and then volume
+        (both descending, ties in listing order)."""
+        live = np.flatnonzero(self.live[:len(self.symbols)])
+        cols = self.cols
+        order = live[np.lexsort((-cols["volume"][live], -cols["market_cap"][live]))]
+        frame = {name: col[order] for name, col in cols.items()}
+        frame["rank"] = np.arange(1, len(order) + 1)
+        frame["symbol"] = [self.symbols[i] for i in order]
+        frame["name"] = [self.names[i] for i in order]
+        frame["type"] = [self.types[i] for i in order]
+        frame["coin"] = [self.mid_keys[i] for i in order]
+        return frame
+
+
+def _pct_change(price, prev_price):
+    return round((price - prev_price) / prev_price * 100, 2) if prev_price > 0 else 0
+
+
+market_table = MarketTable()
+# Held while the table is merged into or frozen for publishing
+table_lock = threading.RLock()
+
+
+def market_rows(perp_resp, spot_resp):
+    """MarketTable.merge rows from a metaAndAssetCtxs and a
+    spotMetaAndAssetCtxs response: every listed perp, plus the most traded
+    pair of each spot token that no perp covers."""
+    # ------ Perp data (metaAndAssetCtxs) ------
+    perp_meta, perp_ctxs = perp_resp
+
+    rows = []
+    perps = set()
+
+    for market, ctx in zip(perp_meta["universe"], perp_ctxs):
+        symbol = market["name"]
+        if market.get("isDelisted"):
+            continue
+
+        mid_px = float(ctx.get("midPx") or 0)
+        prev_px = float(ctx.get("prevDayPx") or 0)
+        day_vol = float(ctx.get("dayNtlVlm") or 0)
+        oracle_px = float(ctx.get("oraclePx") or mid_px)
+
+        ref = COIN_REF.get(symbol, {})
+        circ = ref.get("circ_supply", 0)
+        market_cap = oracle_px * circ if circ else 0
+
+        # allMids keys perps by their own name
+        rows.append((symbol, ref.get("name", symbol), "perp", symbol,
+                     mid_px, prev_px, day_vol, market_cap,
+                     float(ctx.get("openInterest") or 0) * oracle_px,
+                     float(ctx.get("funding") or 0)))
+        perps.add(symbol)
+
+    # ------ Spot data (spotMetaAndAssetCtxs) ------
+    spot_meta, spot_ctxs = spot_resp
+    tokens = spot_meta.get("tokens", [])
+    universe = spot_meta.get("universe", [])
+    token_map = {t["index"]: t for t in tokens}
+
+    # Collect ALL candidates per base token, then pick the best pair
+    # (highest 24h volume) for each.
+    spot_candidates = {}  # display_symbol -> list of candidate dicts
+
+    for i, ctx in enumerate(spot_ctxs):
+        if i >= len(universe):
+            break
+
+        u = universe[i]
+        base_idx = u["tokens"][0]
+        base_token = token_map.get(base_idx, {})
+        raw_name = base_token.get("name", "")
+
+        # Resolve bridged token names (XAUT0 -> XAUT, BNB0 -> BNB, etc.)
+        display_symbol = BRIDGED_TOKEN_MAP.get(raw_name, raw_name)
+
+        # Skip if perp already covers this
+        if display_symbol in perps or f"k{display_symbol}" in perps:
+            continue
+
+        mid_px = float(ctx.get("midPx") or 0)
+        prev_px = float(ctx.get("prevDayPx") or 0)
+        day_vol = float(ctx.get("dayNtlVlm") or 0)
+
+        if mid_px <= 0:
+            continue
+
+        ref = COIN_REF.get(display_symbol) or COIN_REF.get(raw_name, {})
+        is_canonical = u.get("isCanonical", False)
+        in_ref = bool(ref)
+        has_volume = day_vol >= SPOT_MIN_VOLUME
+
+        if not (is_canonical or in_ref or has_volume):
+            continue
+
+        spot_candidates.setdefault(display_symbol, []).append({
+            "raw_name": raw_name,
+            "pair": u.get("name", ""),
+            "mid_px": mid_px,
+            "prev_px": prev_px,
+            "day_vol": day_vol,
+            "ref": ref,
+            "is_canonical": is_canonical,
+        })
+
+    # Pick best pair per token (highest volume)
+    for display_symbol, candidates in spot_candidates.items():
+        best = max(candidates, key=lambda c: c["day_vol"])
+
+        mid_px = best["mid_px"]
+        ref = best["ref"]
+        circ = ref.get("circ_supply", 0)
+        market_cap = mid_px * circ if circ else 0
+
+        # allMids keys spot by pair: "PURR/USDC" or "@<index>"
+        rows.append((display_symbol, ref.get("name", display_symbol), "spot",
+                     best["pair"], mid_px, best["prev_px"], best["day_vol"],
+                     market_cap, 0.0, 0.0))
+    return rows
+
+
+def fetch_hyperliquid_data():
+    """Fetch perp + spot data from Hyperliquid into the market table.
+
+    Returns the number of assets loaded (0 if the fetch failed, in which
+    case the table is left as it was).
+    """
+    try:
+        perp_entry, spot_entry = fetch_market_data(
+            ("metaAndAssetCtxs", "spotMetaAndAssetCtxs"))
+        rows = market_rows(perp_entry["data"], spot_entry["data"])
+        with table_lock:
+            market_table.merge(rows)
+        return len(rows)
+
+    except Exception as e:
+        print(f"Error fetching Hyperliquid data: {e}")
+        traceback.print_exc()
+        return 0
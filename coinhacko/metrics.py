@@ -0,0 +1,131 @@
+"""
+Prometheus metrics, rendered in the text exposition format at /metrics.
+
+Values live in this process: every Flask worker and every warm Vercel
+instance reports its own counters.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)  # bytes
+
+_metrics = []  # in exposition order
+
+
+def _label_str(names, values):
+    pairs = ",".join('%s="%s"' % (n, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with one value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_str(self.labels, labels)} {value}"
+
+
+class Histogram:
+    """Bucketed observations (cumulative only when rendered)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            total = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                total += count
+                yield f"{self.name}_bucket{_label_str(self.labels + ('le',), labels + (bound,))} {total}"
+            yield f"{self.name}_sum{_label_str(self.labels, labels)} {series[-1]}"
+            yield f"{self.name}_count{_label_str(self.labels, labels)} {total}"
+
+
+class _Timer:
+    """Context manager observing elapsed wall time into a histogram."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def render_metrics():
+    """Every registered metric in Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return ("\n".join(lines) + "\n").encode()
+
+
+REQUEST_LATENCY = Histogram("coinhacko_request_duration_seconds",
+                            "HTTP request latency by route.", ("route",))
+REQUESTS = Counter("coinhacko_requests_total",
+                   "HTTP requests by route and status.", ("route", "status"))
+UPSTREAM_LATENCY = Histogram("coinhacko_upstream_duration_seconds",
+                             "Hyperliquid info request latency by type.", ("type",))
+UPSTREAM_BYTES = Histogram("coinhacko_upstream_response_bytes",
+                           "Hyperliquid info response size by type.", ("type",),
+                           buckets=SIZE_BUCKETS)
+UPSTREAM_ERRORS = Counter("coinhacko_upstream_errors_total",
+                          "Failed Hyperliquid info requests by type.", ("type",))
+REFRESH_LATENCY = Histogram("coinhacko_refresh_duration_seconds",
+                            "Refresh stages: upstream fetch + merge, and publish.", ("stage",))
+CACHE_LOOKUPS = Counter("coinhacko_cache_lookups_total",
+                        "Cache lookups by cache and result (hit, miss, stale).",
+                        ("cache", "result"))
+FORMAT_LATENCY = Histogram("coinhacko_format_duration_seconds",
+                           "Building response objects (coin dicts, snapshots) by body.", ("body",))
+SERIALIZE_LATENCY = Histogram("coinhacko_serialize_duration_seconds",
+                              "JSON encoding time by response body.", ("body",))
+COMPRESS_LATENCY = Histogram("coinhacko_compress_duration_seconds",
+                             "Response body compression time by encoding.", ("encoding",))
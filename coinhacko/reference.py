@@ -0,0 +1,38 @@
+"""
+Reference data for ranking: full names and circulating supplies.
+"""
+
+import os
+
+# symbol -> {"name", "circ_supply"}; market_cap = price * circ_supply.
+# Kept as a tab-separated file: parsing it is several times cheaper than
+# compiling the equivalent dict literal, which a cold serverless instance
+# without bytecode caches pays on every start.
+COIN_REF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "coin_ref.tsv")
+
+
+def load_coin_ref(path=COIN_REF_PATH):
+    """Parse a symbol / name / circulating supply file ('#' starts a comment)."""
+    ref = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split("#", 1)[0].strip("\n\t ").split("\t")
+            if len(fields) == 3:
+                symbol, name, circ = fields
+                ref[symbol] = {"name": name, "circ_supply": int(circ)}
+    return ref
+
+
+COIN_REF = load_coin_ref()
+
+# Map Hyperliquid's 0-suffixed bridged token names to canonical symbols.
+# e.g. XAUT0 on HL spot -> "XAUT" in COIN_REF
+# NOTE: Only map tokens whose spot price is reliable.
+# XAUT0 spot data is unreliable; use PAXG perp for gold exposure.
+BRIDGED_TOKEN_MAP = {
+    "AAVE0": "AAVE",
+    "AVAX0": "AVAX",
+}
+
+# Minimum 24h volume (USD) for a spot asset to be included even without COIN_REF
+SPOT_MIN_VOLUME = 500
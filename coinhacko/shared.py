@@ -0,0 +1,150 @@
+"""
+Snapshot store shared by every worker process on a host.
+
+Under gunicorn (or any pre-fork server) each worker would otherwise run its
+own refresh loop against Hyperliquid.  With a store, the workers elect one
+refresher by taking an exclusive flock on `<path>.lock`: it writes every
+published snapshot to `path`, and the rest map that file and read the
+version in its header, rebuilding their Snapshot only when it changed.  A
+refresher that exits drops the lock and the next poll elects another.
+
+File layout: a fixed prefix (magic, version, header length), a JSON header
+(timestamp, string columns, array offsets) and the numeric columns,
+sparklines and raw metaAndAssetCtxs payload, 8-byte aligned.  Readers view
+the arrays in place with np.frombuffer over the mapping.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .encoding import dumps
+
+SHARED_POLL_INTERVAL = 0.25  # seconds between checks of the store file
+SHARED_COLD_WAIT = 15        # seconds a reader with nothing to serve waits
+
+_MAGIC = b"CHSNAP01"
+_PREFIX = struct.Struct("<8sQI")  # magic, version, header length
+
+
+def _aligned(n):
+    return n + (-n % 8)
+
+
+class SharedStore:
+    """One store file plus this process's role in it (`leader` = refresher)."""
+
+    def __init__(self, path, poll_interval=SHARED_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.leader = False
+        self.version = 0  # newest version written or read by this process
+        self._lock = threading.Lock()
+        self._lock_fd = None
+        self._checked = 0
+        self._identity = None  # (inode, mtime) of the file last read
+
+    def elect(self):
+        """Take the refresher lock if no other process holds it."""
+        if self.leader:
+            return True
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Held, through the open descriptor, for the life of the process
+        self._lock_fd = fd
+        self.leader = True
+        return True
+
+    def write(self, snap, frame, market_data):
+        """Replace the store with `snap`, built from `frame`, plus the
+        `market_data` entries the liquidation estimates read."""
+        header = {"ts": snap.ts, "strings": {}, "arrays": {}, "market_data": {}}
+        chunks, pos = [], 0
+
+        def add(name, data):
+            nonlocal pos
+            data = np.ascontiguousarray(data)
+            header["arrays"][name] = [data.dtype.str, pos, len(data)]
+            chunks.append(data.tobytes())
+            pos += data.nbytes
+            chunks.append(bytes(-pos % 8))
+            pos = _aligned(pos)
+
+        for name, col in frame.items():
+            if isinstance(col, np.ndarray):
+                add(name, col)
+            else:
+                header["strings"][name] = col
+        add("sparkline_lengths", np.array([len(s) for s in snap.sparklines], dtype=np.int64))
+        add("sparklines", np.concatenate([np.frombuffer(s, dtype=np.float64) for s in snap.sparklines]
+                                         or [np.empty(0)]))
+        for info_type, entry in market_data.items():
+            body = np.frombuffer(dumps(entry["data"]), dtype=np.uint8)
+            add(info_type, body)
+            header["market_data"][info_type] = entry["ts"]
+
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+        prefix = _PREFIX.pack(_MAGIC, snap.version, len(encoded)) + encoded
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(prefix + bytes(_aligned(len(prefix)) - len(prefix)))
+            f.writelines(chunks)
+        os.replace(tmp, self.path)
+        self.version = snap.version
+
+    def poll(self):
+        """Read the store if it changed since the last poll (at most every
+        poll_interval) and holds a newer version.
+
+        Returns (version, ts, frame, sparklines, market_data) or None.  Tries
+        to take over as refresher first, so a store whose writer exited is
+        picked up on the next poll; callers check `leader` afterwards.
+        """
+        now = time.time()
+        if self.leader or now - self._checked < self.poll_interval:
+            return None
+        with self._lock:
+            if now - self._checked < self.poll_interval:
+                return None
+            self._checked = now
+            if self.elect():
+                return None
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return None
+            if (st.st_ino, st.st_mtime_ns) == self._identity:
+                return None
+            self._identity = (st.st_ino, st.st_mtime_ns)
+            return self.read()
+
+    def read(self):
+        """Like poll(), but reads the file now; None unless it is newer."""
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = _PREFIX.unpack_from(mm)
+        if magic != _MAGIC or version <= self.version:
+            return None
+        header = json.loads(mm[_PREFIX.size:_PREFIX.size + size])
+        base = _aligned(_PREFIX.size + size)
+        arrays = {name: np.frombuffer(mm, dtype, count, base + offset)
+                  for name, (dtype, offset, count) in header["arrays"].items()}
+
+        flat = arrays.pop("sparklines")
+        ends = np.cumsum(arrays.pop("sparkline_lengths")).tolist()
+        sparklines = [flat[start:end] for start, end in zip([0] + ends, ends)]
+        market_data = {info_type: {"ts": ts, "data": json.loads(arrays.pop(info_type).tobytes())}
+                       for info_type, ts in header["market_data"].items()}
+        frame = dict(arrays, **header["strings"])
+        self.version = version
+        return version, header["ts"], frame, sparklines, market_data
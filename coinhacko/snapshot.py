@@ -0,0 +1,474 @@
+"""
+Response snapshots: one immutable, pre-ranked version of the coin list
+with its orderings, search index and memoized encodings.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+from .encoding import dumps
+from .history import SPARKLINE_POINTS, price_history
+from .market import MarketTable
+from .metrics import CACHE_LOOKUPS, SERIALIZE_LATENCY
+from .reference import BRIDGED_TOKEN_MAP, COIN_REF
+
+# Page sizes the frontend asks for; encoded pages of these are kept.
+SNAPSHOT_PER_PAGE = (100,)
+MAX_PER_PAGE = 500
+
+# ?sort= key -> snapshot column; every ordering is precomputed per snapshot
+SORT_COLUMNS = {
+    "market_cap": "market_cap",
+    "volume": "total_volume",
+    "change_24h": "price_change_percentage_24h",
+    "price": "current_price",
+}
+COIN_TYPES = ("perp", "spot")
+SEARCH_MAX_LEN = 32
+IMAGE_URL = "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/{}.png"
+QUERY_CACHE_SIZE = 64  # filtered orderings kept per snapshot
+
+# Keys of a formatted coin, in output order; ?fields= picks a subset
+COIN_FIELDS = ("id", "symbol", "name", "image", "current_price", "market_cap_rank",
+               "price_change_percentage_24h", "market_cap", "total_volume",
+               "high_24h", "low_24h", "circulating_supply", "type", "sparkline_in_7d")
+SPARKLINE_LENGTHS = (24, SPARKLINE_POINTS)  # ?sparkline= point counts ("false" drops it)
+PRECISION_RANGE = (1, 15)   # ?precision= significant digits
+PROJECTION_CACHE_SIZE = 16  # distinct views (see parse_view) encoded per snapshot
+BATCH_MAX_IDS = 500
+
+# ?format=compact sends each coin as a row of these values instead of an
+# object (the image URL is left out: it is derived from the id).
+PAGE_FORMATS = ("json", "compact")
+COMPACT_COLUMNS = ("id", "symbol", "name", "current_price", "market_cap_rank",
+                   "price_change_percentage_24h", "market_cap", "total_volume",
+                   "high_24h", "low_24h", "circulating_supply", "type", "sparkline_in_7d")
+
+
+class PrefixIndex:
+    """Sorted (key, symbol) pairs; a prefix lookup is two bisects."""
+
+    def __init__(self, entries):
+        pairs = sorted({(key.lower(), symbol) for key, symbol in entries})
+        self.keys = [key for key, _ in pairs]
+        self.symbols = [symbol for _, symbol in pairs]
+
+    def match(self, prefix):
+        """Symbols with a key starting with `prefix` (case-insensitive)."""
+        prefix = prefix.lower()
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return set(self.symbols[lo:hi])
+
+
+def _search_entries(symbol, name):
+    """Search keys for one asset: symbol, full name and each later word of
+    the name ("cash" finds Bitcoin Cash)."""
+    yield symbol, symbol
+    yield name, symbol
+    for word in name.split()[1:]:
+        yield word, symbol
+
+
+# Reference names never change, so their index is built once
+COIN_SEARCH = PrefixIndex(entry for symbol, ref in COIN_REF.items()
+                          for entry in _search_entries(symbol, ref["name"]))
+
+
+def parse_coin_query(args):
+    """Validate /api/coins sort/filter parameters.
+
+    Returns (sort, order, type, min_volume, q), or None for the default
+    market cap ordering with no filters.  Raises ValueError on bad input.
+    """
+    sort = args.get("sort", "market_cap")
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    order = args.get("order", "desc")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    kind = args.get("type") or None
+    if kind is not None and kind not in COIN_TYPES:
+        raise ValueError("type must be perp or spot")
+    try:
+        min_volume = float(args.get("min_volume", 0))
+    except ValueError:
+        raise ValueError("min_volume must be a number")
+    if not 0 <= min_volume < float("inf"):
+        raise ValueError("min_volume must be a non-negative number")
+    q = args.get("q", "").strip() or None
+    if q is not None and len(q) > SEARCH_MAX_LEN:
+        raise ValueError(f"q must be at most {SEARCH_MAX_LEN} characters")
+    query = (sort, order, kind, min_volume, q)
+    return None if query == ("market_cap", "desc", None, 0, None) else query
+
+
+def parse_page(args):
+    """Validate ?page= and ?per_page=; returns (page, per_page).  Raises
+    ValueError on bad input."""
+    try:
+        page = int(args.get("page", 1))
+        per_page = int(args.get("per_page", 100))
+    except ValueError:
+        raise ValueError("page and per_page must be integers")
+    if page < 1:
+        raise ValueError("page must be at least 1")
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        raise ValueError(f"per_page must be between 1 and {MAX_PER_PAGE}")
+    return page, per_page
+
+
+def parse_view(args):
+    """Validate ?fields=, ?sparkline= and ?precision=.
+
+    Returns (fields, points, precision): the COIN_FIELDS to send in output
+    order ("id" is always included), sparkline points (0 when it is left
+    out) and significant digits for floats (None for full precision); or
+    None for the full coin.  Raises ValueError on bad input.
+    """
+    fields = COIN_FIELDS
+    raw = args.get("fields")
+    if raw:
+        wanted = {f.strip() for f in raw.split(",") if f.strip()}
+        unknown = wanted.difference(COIN_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+        fields = tuple(f for f in COIN_FIELDS if f in wanted or f == "id")
+    sparkline = args.get("sparkline", "true")
+    if sparkline in ("false", "0"):
+        points = 0
+    elif sparkline == "true":
+        points = SPARKLINE_POINTS
+    elif sparkline.isdigit() and int(sparkline) in SPARKLINE_LENGTHS:
+        points = int(sparkline)
+    else:
+        raise ValueError(f"sparkline must be false or one of {', '.join(map(str, SPARKLINE_LENGTHS))}")
+    if points == 0:
+        fields = tuple(f for f in fields if f != "sparkline_in_7d")
+    elif "sparkline_in_7d" not in fields:
+        points = 0
+    precision = args.get("precision")
+    if precision is not None:
+        lo, hi = PRECISION_RANGE
+        if not (precision.isdigit() and lo <= int(precision) <= hi):
+            raise ValueError(f"precision must be an integer from {lo} to {hi}")
+        precision = int(precision)
+    view = (fields, points, precision)
+    return None if view == (COIN_FIELDS, SPARKLINE_POINTS, None) else view
+
+
+def round_significant(values, digits):
+    """`values` (float array) rounded to `digits` significant digits."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        exponent = digits - 1 - np.floor(np.log10(np.abs(values)))
+        # Scale by exact powers of ten so the result is the nearest double
+        scale = 10.0 ** np.abs(exponent)
+        rounded = np.where(exponent >= 0, np.round(values * scale) / scale,
+                           np.round(values / scale) * scale)
+    return np.where(np.isfinite(rounded), rounded, values)
+
+
+def compact_columns(view=None):
+    """COMPACT_COLUMNS restricted to the fields of `view`."""
+    if view is None:
+        return COMPACT_COLUMNS
+    return tuple(c for c in COMPACT_COLUMNS if c in view[0])
+
+
+def encode_page(version, fragments, page, per_page, total, fmt="json", view=None):
+    """Assemble a /api/coins page from pre-encoded coin fragments."""
+    if fmt == "compact":
+        head = b'{"version":%d,"columns":%s,"rows":[' % (version, dumps(compact_columns(view)))
+    else:
+        head = b'{"version":%d,"data":[' % version
+    tail = b'],"page":%d,"per_page":%d,"total":%d,"total_pages":%d}' % (
+        page, per_page, total, (total + per_page - 1) // per_page)
+    return head + b",".join(fragments) + tail
+
+
+def build_coin_aliases(symbols, ids):
+    """Map upper-case symbols and their alternative spellings to coin ids.
+
+    Besides each symbol itself this covers bridged spot names (AAVE0 -> AAVE)
+    and the base token of k-prefixed perps (PEPE -> kPEPE) when the base is
+    not listed on its own.
+    """
+    aliases = {symbol.upper(): coin_id for symbol, coin_id in zip(symbols, ids)}
+    for raw, canonical in BRIDGED_TOKEN_MAP.items():
+        if canonical.upper() in aliases:
+            aliases.setdefault(raw.upper(), aliases[canonical.upper()])
+    for symbol, coin_id in zip(symbols, ids):
+        if len(symbol) > 1 and symbol[0] == "k" and symbol[1:].isupper():
+            aliases.setdefault(symbol[1:], coin_id)
+    return aliases
+
+
+class Snapshot:
+    """One published version of the coin list.
+
+    Every response field is computed as a column when the snapshot is
+    built; per-coin dicts and the page/detail bodies are only formatted when
+    first requested and then kept for the life of the version.  Published
+    snapshots are never changed apart from those memos, so request threads
+    read them without a lock.
+
+    `sparklines` (one series per priced coin, in rank order) defaults to
+    this process's price_history; shared-store readers pass the writer's.
+    """
+
+    def __init__(self, version=0, ts=0, frame=None, sparklines=None):
+        if frame is None:
+            frame = MarketTable(0).freeze()
+        self.version = version
+        self.etag = f"v{version}"
+        self.ts = ts
+
+        # Ranks are assigned before unpriced assets are dropped
+        keep = np.flatnonzero(frame["price"] > 0)
+        price = frame["price"][keep]
+        change = frame["change_24h"][keep]
+        market_cap = frame["market_cap"][keep]
+        # Candle ranges (coinhacko.candles) where synced, else estimated
+        # from the 24h change
+        swing = np.abs(change) / 100
+        high = price * (1 + swing)
+        low = price * (1 - swing)
+        if "high_24h" in frame:
+            synced = ~np.isnan(frame["high_24h"][keep])
+            high[synced] = frame["high_24h"][keep][synced]
+            low[synced] = frame["low_24h"][keep][synced]
+        self.columns = {
+            "current_price": price,
+            "market_cap_rank": frame["rank"][keep],
+            "price_change_percentage_24h": change,
+            "market_cap": market_cap,
+            "total_volume": frame["volume"][keep],
+            "high_24h": high,
+            "low_24h": low,
+            "circulating_supply": market_cap / price,
+        }
+        self.symbols = [frame["symbol"][i] for i in keep]
+        self.names = [frame["name"][i] for i in keep]
+        self.types = [frame["type"][i] for i in keep]
+        self.ids = [s.lower() for s in self.symbols]
+        self.index = {coin_id: i for i, coin_id in enumerate(self.ids)}
+        self.aliases = build_coin_aliases(self.symbols, self.ids)
+        if sparklines is None:
+            sparklines = [price_history.sparkline(s) for s in self.symbols]
+        self.sparklines = sparklines
+
+        # Stable argsorts, so ties keep market cap rank order
+        self.orderings = {}
+        for sort, field in SORT_COLUMNS.items():
+            col = self.columns[field]
+            self.orderings[(sort, "desc")] = np.argsort(-col, kind="stable")
+            self.orderings[(sort, "asc")] = np.argsort(col, kind="stable")
+        self.is_spot = np.array([t == "spot" for t in self.types], dtype=bool)
+        # Listed assets without reference data are searched by their own names
+        self.search = PrefixIndex(entry for symbol, name in zip(self.symbols, self.names)
+                                  if symbol not in COIN_REF
+                                  for entry in _search_entries(symbol, name))
+
+        self._coins = [None] * len(self.ids)
+        self._fragments = [None] * len(self.ids)
+        self._rows = [None] * len(self.ids)
+        self._views = {}    # (view, fmt) -> encodings like _fragments/_rows
+        self._values = {}      # precision -> field values for project()
+        self._sparklines = {}  # precision -> rounded sparklines
+        self._pages = {}
+        self._queries = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def coin(self, i):
+        """The formatted dict for the coin at rank position `i`."""
+        coin = self._coins[i]
+        if coin is None:
+            cols = self.columns
+            sym_lower = self.ids[i]
+            coin = {
+                "id": sym_lower,
+                "symbol": self.symbols[i],
+                "name": self.names[i],
+                "image": IMAGE_URL.format(sym_lower),
+                "current_price": cols["current_price"][i].item(),
+                "market_cap_rank": cols["market_cap_rank"][i].item(),
+                "price_change_percentage_24h": cols["price_change_percentage_24h"][i].item(),
+                "market_cap": cols["market_cap"][i].item(),
+                "total_volume": cols["total_volume"][i].item(),
+                "high_24h": cols["high_24h"][i].item(),
+                "low_24h": cols["low_24h"][i].item(),
+                "circulating_supply": cols["circulating_supply"][i].item(),
+                "type": self.types[i],
+                "sparkline_in_7d": {"price": self.sparklines[i].tolist()},
+            }
+            self._coins[i] = coin
+        return coin
+
+    def coins(self, start=None, stop=None):
+        """Formatted coins in rank order, sliced like a list."""
+        return [self.coin(i) for i in range(len(self.ids))[start:stop]]
+
+    def _field_values(self, precision):
+        """Every scalar coin field as a list, floats rounded to `precision`
+        significant digits unless None; computed once per version."""
+        values = self._values.get(precision)
+        if values is None:
+            values = {"id": self.ids, "symbol": self.symbols, "name": self.names,
+                      "image": [IMAGE_URL.format(coin_id) for coin_id in self.ids],
+                      "type": self.types}
+            for name, col in self.columns.items():
+                if precision is not None and col.dtype.kind == "f":
+                    col = round_significant(col, precision)
+                values[name] = col.tolist()
+            self._values[precision] = values
+        return values
+
+    def _rounded_sparklines(self, precision):
+        """Sparklines rounded to `precision` significant digits, in one pass."""
+        sparklines = self._sparklines.get(precision)
+        if sparklines is None:
+            flat = np.concatenate([np.frombuffer(s, dtype=np.float64) for s in self.sparklines]
+                                  or [np.empty(0)])
+            flat = round_significant(flat, precision)
+            ends = np.cumsum([len(s) for s in self.sparklines]).tolist()
+            sparklines = self._sparklines[precision] = [
+                flat[start:end] for start, end in zip([0] + ends, ends)]
+        return sparklines
+
+    def project(self, i, view):
+        """The coin at position `i` as seen through `view` (see parse_view)."""
+        if view is None:
+            return self.coin(i)
+        fields, points, precision = view
+        values = self._field_values(precision)
+        projected = {f: values[f][i] for f in fields if f != "sparkline_in_7d"}
+        if points:
+            sparklines = self.sparklines if precision is None else self._rounded_sparklines(precision)
+            projected["sparkline_in_7d"] = {"price": sparklines[i][-points:].tolist()}
+        return projected
+
+    def _memo(self, view, fmt="json"):
+        """Per-coin encodings of one view and format; None once
+        PROJECTION_CACHE_SIZE views are kept (encoded per request then)."""
+        if view is None:
+            return self._rows if fmt == "compact" else self._fragments
+        memo = self._views.get((view, fmt))
+        if memo is None and len(self._views) < PROJECTION_CACHE_SIZE:
+            memo = self._views.setdefault((view, fmt), [None] * len(self.ids))
+        return memo
+
+    def fragment(self, i, view=None):
+        """Encoded JSON object for the coin at position `i`; every page and
+        the detail route reuse it, so each coin is encoded once per version
+        and view."""
+        memo = self._memo(view)
+        body = memo[i] if memo is not None else None
+        if body is None:
+            body = dumps(self.project(i, view))
+            if memo is not None:
+                memo[i] = body
+        return body
+
+    def row(self, i, view=None):
+        """Encoded ?format=compact row (compact_columns) for position `i`."""
+        memo = self._memo(view, "compact")
+        body = memo[i] if memo is not None else None
+        if body is None:
+            coin = self.project(i, view)
+            body = dumps([coin[c]["price"] if c == "sparkline_in_7d" else coin[c]
+                          for c in compact_columns(view)])
+            if memo is not None:
+                memo[i] = body
+        return body
+
+    def select(self, query=None):
+        """Rank positions matching `query` (see parse_coin_query), in order.
+
+        A slice of a precomputed ordering, masked by the filters; the result
+        is kept for repeat queries against this version.
+        """
+        if query is None:
+            return self.orderings[("market_cap", "desc")]
+        positions = self._queries.get(query)
+        if positions is not None:
+            return positions
+        sort, order, kind, min_volume, q = query
+        positions = self.orderings[(sort, order)]
+        mask = np.ones(len(self.ids), dtype=bool)
+        if kind is not None:
+            mask &= self.is_spot == (kind == "spot")
+        if min_volume:
+            mask &= self.columns["total_volume"] >= min_volume
+        if q is not None:
+            found = np.zeros(len(self.ids), dtype=bool)
+            for symbol in COIN_SEARCH.match(q) | self.search.match(q):
+                i = self.index.get(symbol.lower())
+                if i is not None:
+                    found[i] = True
+            mask &= found
+        positions = positions[mask[positions]]
+        if len(self._queries) < QUERY_CACHE_SIZE:
+            self._queries[query] = positions
+        return positions
+
+    def page(self, page, per_page, query=None, fmt="json", view=None):
+        """Serialize one /api/coins page to JSON bytes.
+
+        Pages are joined from per-coin fragments.  Unfiltered pages of the
+        frontend's sizes are kept whole (per view, for the views that are
+        memoized); anything else is assembled on every request from the
+        selected positions.
+        """
+        key = (page, per_page, fmt, view)
+        body = self._pages.get(key) if query is None else None
+        if body is not None:
+            CACHE_LOOKUPS.inc("page", "hit")
+            return body
+        CACHE_LOOKUPS.inc("page", "miss")
+        positions = self.select(query)
+        start = (page - 1) * per_page
+        encode = self.row if fmt == "compact" else self.fragment
+        with SERIALIZE_LATENCY.time("page"):
+            fragments = [encode(i, view) for i in positions[start:start + per_page]]
+            body = encode_page(self.version, fragments, page, per_page, len(positions), fmt, view)
+        # Only pages inside the list, so ?page= can't grow the cache
+        if (query is None and per_page in SNAPSHOT_PER_PAGE and (page == 1 or start < len(positions))
+                and (view is None or (view, fmt) in self._views)):
+            self._pages[key] = body
+        return body
+
+    def detail(self, coin_id, view=None):
+        """JSON bytes for /api/coin/<coin_id> (`coin_id` must be resolved)."""
+        i = self.index[coin_id]
+        memo = self._memo(view)
+        CACHE_LOOKUPS.inc("detail", "miss" if memo is None or memo[i] is None else "hit")
+        with SERIALIZE_LATENCY.time("detail"):
+            return self.fragment(i, view)
+
+    def batch(self, coin_ids, view=None):
+        """JSON bytes for /api/coins/batch: the coins for `coin_ids` (ids,
+        symbols or aliases) in request order, duplicates dropped, plus the
+        ones that didn't resolve under "missing"."""
+        positions, missing, seen = [], [], set()
+        for raw in coin_ids:
+            coin_id = self.resolve(raw)
+            if coin_id is None:
+                missing.append(raw)
+            elif coin_id not in seen:
+                seen.add(coin_id)
+                positions.append(self.index[coin_id])
+        with SERIALIZE_LATENCY.time("batch"):
+            fragments = [self.fragment(i, view) for i in positions]
+            return b'{"version":%d,"data":[%s],"missing":%s}' % (
+                self.version, b",".join(fragments), dumps(missing))
+
+    def resolve(self, coin_id):
+        """Resolve an id, symbol or alias to a coin id (None if unknown)."""
+        key = coin_id.lower()
+        if key in self.index:
+            return key
+        return self.aliases.get(coin_id.upper())
@@ -0,0 +1,93 @@
+"""
+Snapshot diffs and the fan-out behind the Server-Sent Events stream.
+"""
+
+import queue
+import threading
+
+import numpy as np
+
+from .encoding import dumps
+from .metrics import SERIALIZE_LATENCY
+
+# Fields pushed when they change between two snapshots
+STREAM_FIELDS = ("current_price", "market_cap_rank", "price_change_percentage_24h",
+                 "total_volume", "market_cap")
+STREAM_KEEPALIVE = 15    # seconds between keep-alive comments
+STREAM_QUEUE_SIZE = 8    # undelivered messages before a client is dropped
+
+
+def diff_snapshots(old, new, fields=STREAM_FIELDS):
+    """Per-coin changes of `fields` between two snapshots, plus ids that
+    were added or removed.
+
+    Compares whole columns: `new` rows are aligned to their position in
+    `old` and only coins with a differing field are formatted.
+    """
+    pos = np.fromiter((old.index.get(i, -1) for i in new.ids), dtype=np.intp, count=len(new))
+    both = np.flatnonzero(pos >= 0)
+    moved = {f: new.columns[f][both] != old.columns[f][pos[both]] for f in fields}
+    changed = {}
+    for j in np.flatnonzero(np.logical_or.reduce([moved[f] for f in fields])):
+        i = both[j]
+        changed[new.ids[i]] = {f: new.columns[f][i].item() for f in fields if moved[f][j]}
+    return {
+        "version": new.version,
+        "changed": changed,
+        "added": [new.ids[i] for i in np.flatnonzero(pos < 0)],
+        "removed": [i for i in old.ids if i not in new.index],
+    }
+
+
+def encode_stream_update(diff):
+    """One SSE frame, encoded once and written to every subscriber."""
+    with SERIALIZE_LATENCY.time("stream"):
+        data = dumps(diff)
+    return b"id: %d\nevent: update\ndata: %s\n\n" % (diff["version"], data)
+
+
+class Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = False
+
+
+class Broadcaster:
+    """Fans one pre-encoded message out to every connected stream.
+
+    Publishing never blocks: a subscriber whose queue is full is dropped and
+    its stream ends, and the client's EventSource reconnects and resyncs.
+    """
+
+    def __init__(self, maxsize=STREAM_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        sub = Subscriber(self.maxsize)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                sub.dropped = True
+                self.unsubscribe(sub)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,299 @@
+"""
+Perp funding, open interest, premium and oracle price over time.
+
+Every metaAndAssetCtxs fetch is appended to rollup rings at each of
+SERIES_RESOLUTIONS: one numpy array of bucket means per resolution
+(bucket x asset x field) sharing a single time axis, so a refresh updates
+every asset with a few vectorized operations and a history query slices a
+precomputed ring instead of rescanning raw points.
+
+With COINHACKO_SERIES_DIR set, each finished 1m bucket is also appended to
+a daily segment file there (SERIES_RETENTION days are kept), and a
+restarted process rebuilds its rollups from them.
+"""
+
+import datetime
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+SERIES_FIELDS = ("funding", "open_interest", "premium", "oracle_price")
+# resolution -> (bucket width in seconds, number of buckets)
+SERIES_RESOLUTIONS = {
+    "1m": (60, 360),       # 6 hours
+    "1h": (3600, 720),     # 30 days
+    "1d": (86400, 365),    # 1 year
+}
+SERIES_DIR = os.environ.get("COINHACKO_SERIES_DIR", "")
+SERIES_RETENTION = 7  # days of 1m segment files kept on disk
+
+_RECORD = struct.Struct("<cdI")  # kind, bucket start, count
+
+
+def series_rows(perp_resp):
+    """(symbols, values) from a metaAndAssetCtxs response: one row of
+    SERIES_FIELDS per listed perp, open interest as USD notional."""
+    perp_meta, perp_ctxs = perp_resp
+    symbols, values = [], []
+    for market, ctx in zip(perp_meta["universe"], perp_ctxs):
+        if market.get("isDelisted"):
+            continue
+        oracle_px = float(ctx.get("oraclePx") or 0)
+        premium = ctx.get("premium")
+        symbols.append(market["name"])
+        values.append((float(ctx.get("funding") or 0),
+                       float(ctx.get("openInterest") or 0) * oracle_px,
+                       float(premium) if premium is not None else np.nan,
+                       oracle_px))
+    return symbols, np.array(values, dtype=np.float64).reshape(-1, len(SERIES_FIELDS))
+
+
+class RollupRing:
+    """Bucket means for every asset at one resolution, in a ring of buckets."""
+
+    def __init__(self, width, size, fields, capacity):
+        self.width = width
+        self.size = size
+        self.means = np.full((size, capacity, fields), np.nan)
+        self.counts = np.zeros((size, capacity), dtype=np.int32)
+        self.last_bucket = None
+
+    def grow(self, capacity):
+        pad = capacity - self.counts.shape[1]
+        self.means = np.concatenate(
+            (self.means, np.full((self.size, pad, self.means.shape[2]), np.nan)), axis=1)
+        self.counts = np.concatenate(
+            (self.counts, np.zeros((self.size, pad), dtype=np.int32)), axis=1)
+
+    def add(self, ts, cols, values, weights=1):
+        """Fold `values` (one row per column in `cols`) into the bucket of `ts`.
+
+        Returns the bucket this closed, or None: buckets are final once a
+        later one has been started.
+        """
+        bucket = int(ts // self.width)
+        last = self.last_bucket
+        closed = None
+        if last is None or bucket > last:
+            first = bucket - self.size + 1 if last is None else max(last + 1, bucket - self.size + 1)
+            for b in range(first, bucket + 1):
+                self.means[b % self.size] = np.nan
+                self.counts[b % self.size] = 0
+            self.last_bucket = bucket
+            closed = last
+        elif bucket <= last - self.size:
+            return None  # older than the ring
+        slot = bucket % self.size
+        counts = self.counts[slot, cols] + weights
+        means = self.means[slot, cols]
+        step = (np.asarray(weights) / counts)[:, None]
+        updated = np.where(np.isnan(means), values, means + (values - means) * step)
+        self.means[slot, cols] = np.where(np.isnan(values), means, updated)
+        self.counts[slot, cols] = counts
+        return closed
+
+    def bucket(self, bucket):
+        """(means, counts) of one bucket across all columns."""
+        slot = bucket % self.size
+        return self.means[slot], self.counts[slot]
+
+    def series(self, col, field, limit=None):
+        """(bucket start times, means) of one column, oldest first, skipping
+        empty buckets; at most `limit` of the newest."""
+        if self.last_bucket is None or col >= self.counts.shape[1]:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        buckets = np.arange(self.last_bucket - self.size + 1, self.last_bucket + 1)
+        slots = buckets % self.size
+        filled = self.counts[slots, col] > 0
+        buckets, slots = buckets[filled], slots[filled]
+        if limit:
+            buckets, slots = buckets[-limit:], slots[-limit:]
+        return buckets * self.width, self.means[slots, col, field]
+
+
+class SegmentLog:
+    """Daily append-only files of finished 1m buckets.
+
+    Records are a symbol table (kind S, JSON list; at the start of every
+    file and whenever columns are added) or a bucket (kind B: counts as
+    uint32, then means as float32, for the first n symbols).
+    """
+
+    def __init__(self, directory, fields, retention=SERIES_RETENTION):
+        self.directory = directory
+        self.fields = fields
+        self.retention = retention
+        self._file = None
+        self._day = None
+        self._written_symbols = 0
+        self.last_ts = None  # newest bucket written or replayed
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"series-{day:%Y%m%d}.seg")
+
+    def _records(self, data):
+        """(kind, ts, n, body start, body end) of each complete record."""
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            kind, ts, n = _RECORD.unpack_from(data, pos)
+            start = pos + _RECORD.size
+            pos = start + (n if kind == b"S" else n * 4 * (1 + self.fields))
+            if pos > len(data):
+                return
+            yield kind, ts, n, start, pos
+
+    def _open(self, day):
+        path = self._path(day)
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(path, "a+b")
+        # Drop a record cut short by a crash so appends stay aligned
+        f.seek(0)
+        valid = 0
+        for *_, end in self._records(f.read()):
+            valid = end
+        f.truncate(valid)
+        return f
+
+    def append(self, ts, symbols, means, counts):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        self.last_ts = ts
+        day = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date()
+        if day != self._day:
+            if self._file is not None:
+                self._file.close()
+            self._file = self._open(day)
+            self._day = day
+            self._written_symbols = 0
+            self._prune(day)
+        n = len(symbols)
+        if n != self._written_symbols:
+            table = json.dumps(symbols).encode()
+            self._file.write(_RECORD.pack(b"S", ts, len(table)) + table)
+            self._written_symbols = n
+        self._file.write(_RECORD.pack(b"B", ts, n) + counts[:n].astype("<u4").tobytes()
+                         + means[:n].astype("<f4").tobytes())
+        self._file.flush()
+
+    def _prune(self, today):
+        cutoff = f"series-{today - datetime.timedelta(days=self.retention):%Y%m%d}.seg"
+        for name in os.listdir(self.directory):
+            if name.startswith("series-") and name.endswith(".seg") and name < cutoff:
+                os.remove(os.path.join(self.directory, name))
+
+    def replay(self):
+        """Yield (ts, symbols, means, counts) for every stored bucket, oldest first."""
+        try:
+            names = sorted(n for n in os.listdir(self.directory)
+                           if n.startswith("series-") and n.endswith(".seg"))
+        except FileNotFoundError:
+            return
+        fields = self.fields
+        for name in names:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+            symbols = []
+            for kind, ts, n, start, end in self._records(data):
+                if kind == b"S":
+                    symbols = json.loads(data[start:end])
+                    continue
+                counts = np.frombuffer(data, "<u4", n, start)
+                means = np.frombuffer(data, "<f4", n * fields, start + n * 4).reshape(n, fields)
+                self.last_ts = ts
+                yield ts, symbols[:n], means.astype(np.float64), counts.astype(np.int32)
+
+
+class SeriesStore:
+    """Rollups of SERIES_FIELDS for every perp, optionally backed by segments."""
+
+    def __init__(self, directory=SERIES_DIR, fields=SERIES_FIELDS,
+                 resolutions=SERIES_RESOLUTIONS, capacity=256):
+        self.fields = fields
+        self.symbols = []  # column -> symbol
+        self.columns = {}  # symbol -> column
+        self.rings = {res: RollupRing(width, size, len(fields), capacity)
+                      for res, (width, size) in resolutions.items()}
+        self.segments = SegmentLog(directory, len(fields)) if directory else None
+        self.source_ts = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _cols(self, symbols):
+        new = [s for s in symbols if s not in self.columns]
+        if new:
+            capacity = self.rings["1m"].counts.shape[1]
+            if len(self.symbols) + len(new) > capacity:
+                for ring in self.rings.values():
+                    ring.grow(max(2 * capacity, len(self.symbols) + len(new)))
+            for symbol in new:
+                self.columns[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        return np.array([self.columns[s] for s in symbols], dtype=np.intp)
+
+    def _load(self):
+        """Rebuild the rollups from segment files (once, on first use)."""
+        self._loaded = True
+        if self.segments is None:
+            return
+        for ts, symbols, means, counts in self.segments.replay():
+            filled = counts > 0
+            cols = self._cols([s for s, f in zip(symbols, filled) if f])
+            for ring in self.rings.values():
+                ring.add(ts, cols, means[filled], counts[filled])
+
+    def record(self, entry, persist=True):
+        """Append a metaAndAssetCtxs store entry (a no-op if already recorded).
+
+        With `persist`, finished 1m buckets go to the segment files; only
+        one process per directory should persist.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if entry["ts"] == self.source_ts:
+                return
+            self.source_ts = entry["ts"]
+            symbols, values = series_rows(entry["data"])
+            cols = self._cols(symbols)
+            for res, ring in self.rings.items():
+                closed = ring.add(entry["ts"], cols, values)
+                if res == "1m" and closed is not None and persist and self.segments is not None:
+                    means, counts = ring.bucket(closed)
+                    try:
+                        self.segments.append(closed * ring.width, self.symbols, means, counts)
+                    except OSError as e:
+                        print(f"Error writing series segment: {e}")
+
+    def query(self, symbol, field, res, limit=None):
+        """[[bucket start, mean], ...] oldest first, or None for an unknown symbol."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            col = self.columns.get(symbol)
+            if col is None:
+                return None
+            times, values = self.rings[res].series(col, self.fields.index(field), limit)
+        return [[t, None if v != v else v] for t, v in zip(times.tolist(), values.tolist())]
+
+
+def parse_history_params(args):
+    """Validate history query args; raises ValueError with a client message."""
+    field = args.get("field", "funding")
+    if field not in SERIES_FIELDS:
+        raise ValueError(f"field must be one of {', '.join(SERIES_FIELDS)}")
+    res = args.get("res", "1h")
+    if res not in SERIES_RESOLUTIONS:
+        raise ValueError(f"res must be one of {', '.join(SERIES_RESOLUTIONS)}")
+    try:
+        limit = int(args["limit"]) if "limit" in args else None
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    return field, res, limit
+
+
+series_store = SeriesStore()
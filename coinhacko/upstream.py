@@ -0,0 +1,124 @@
+"""
+Hyperliquid info client and the raw market data store.
+
+Only the standard library is used here so the Vercel function needs no
+extra packages.
+"""
+
+import gzip
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+
+from .metrics import CACHE_LOOKUPS, UPSTREAM_BYTES, UPSTREAM_ERRORS, UPSTREAM_LATENCY
+
+HYPERLIQUID_API_URL = "https://api.hyperliquid.xyz/info"
+
+# ---------------------------------------------------------------------------
+# Upstream client - one kept-alive HTTPS connection per worker thread
+# ---------------------------------------------------------------------------
+HL_TIMEOUT = 10      # seconds
+HL_RETRIES = 2
+HL_BACKOFF = 0.3     # seconds; doubles on each retry
+HL_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_HL_URL = urlparse(HYPERLIQUID_API_URL)
+_HL_HEADERS = {"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+
+_conn_local = threading.local()
+_upstream_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hl-info")
+
+
+def _hl_connection():
+    conn = getattr(_conn_local, "conn", None)
+    if conn is None:
+        conn = _conn_local.conn = http.client.HTTPSConnection(_HL_URL.netloc, timeout=HL_TIMEOUT)
+    return conn
+
+
+def _hl_post(payload):
+    """POST to the Hyperliquid info endpoint; records latency and size per info type."""
+    info_type = payload.get("type", "other")
+    start = time.perf_counter()
+    try:
+        data = _hl_request(json.dumps(payload).encode())
+    except Exception:
+        UPSTREAM_ERRORS.inc(info_type)
+        raise
+    UPSTREAM_LATENCY.observe(time.perf_counter() - start, info_type)
+    UPSTREAM_BYTES.observe(len(data), info_type)
+    return json.loads(data)
+
+
+def _hl_request(body):
+    """Raw (decompressed) response body over a kept-alive connection.
+
+    Info requests are read-only, so connection errors and 429/5xx responses
+    are retried with exponential backoff.
+    """
+    for attempt in range(HL_RETRIES + 1):
+        if attempt:
+            time.sleep(HL_BACKOFF * 2 ** (attempt - 1))
+        conn = _hl_connection()
+        try:
+            conn.request("POST", _HL_URL.path, body=body, headers=_HL_HEADERS)
+            resp = conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            _conn_local.conn = None
+            if attempt == HL_RETRIES:
+                raise
+            continue
+        if resp.status in HL_RETRY_STATUSES and attempt < HL_RETRIES:
+            continue
+        if resp.status >= 400:
+            raise HTTPError(HYPERLIQUID_API_URL, resp.status, resp.reason, resp.headers, None)
+        if resp.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return data
+
+
+def _hl_post_many(payloads):
+    """Issue several info requests concurrently; results keep payload order."""
+    futures = [_upstream_pool.submit(_hl_post, p) for p in payloads]
+    return [f.result() for f in futures]
+
+
+# ---------------------------------------------------------------------------
+# Raw market data store
+# ---------------------------------------------------------------------------
+# info type -> {"data": parsed response, "ts": fetch time}.  The coin list and
+# the liquidation estimator both derive their views from these payloads, so
+# they share upstream requests and show prices from the same moment.
+market_data = {}
+_market_data_lock = threading.Lock()
+
+
+def fetch_market_data(info_types):
+    """Fetch `info_types` concurrently, store them and return their entries."""
+    results = _hl_post_many([{"type": t} for t in info_types])
+    ts = time.time()
+    entries = [{"data": data, "ts": ts} for data in results]
+    market_data.update(zip(info_types, entries))
+    return entries
+
+
+def get_market_data(info_type, max_age):
+    """Return the stored entry for `info_type`, refetching it only if it is
+    older than `max_age` seconds (each consumer picks its own tolerance)."""
+    entry = market_data.get(info_type)
+    if entry is not None and time.time() - entry["ts"] <= max_age:
+        CACHE_LOOKUPS.inc("market_data", "hit")
+        return entry
+    with _market_data_lock:
+        entry = market_data.get(info_type)
+        if entry is None or time.time() - entry["ts"] > max_age:
+            CACHE_LOOKUPS.inc("market_data", "miss")
+            entry = fetch_market_data([info_type])[0]
+        else:
+            CACHE_LOOKUPS.inc("market_data", "hit")
+    return entry
@@ -0,0 +1,78 @@
+"""
+WebSocket ingestion (INGEST_MODE=ws): Hyperliquid allMids pushes.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+
+from .metrics import UPSTREAM_ERRORS
+
+HYPERLIQUID_WS_URL = os.environ.get("HYPERLIQUID_WS_URL", "wss://api.hyperliquid.xyz/ws")
+WS_PUBLISH_INTERVAL = 1     # seconds; pushes are coalesced into one snapshot
+WS_RECONNECT_MAX = 30       # seconds; reconnect backoff cap
+
+
+class WsIngestor:
+    """Keeps an allMids subscription open and hands coalesced mids to `apply`
+    once per publish interval."""
+
+    def __init__(self, apply, url=HYPERLIQUID_WS_URL, publish_interval=WS_PUBLISH_INTERVAL):
+        self.apply = apply
+        self.url = url
+        self.publish_interval = publish_interval
+        self.connected = False
+        self.messages = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run_socket, daemon=True).start()
+        threading.Thread(target=self._run_publisher, daemon=True).start()
+
+    def _on_open(self, ws):
+        self.connected = True
+        ws.send(json.dumps({"method": "subscribe", "subscription": {"type": "allMids"}}))
+
+    def _on_message(self, ws, message):
+        msg = json.loads(message)
+        if msg.get("channel") != "allMids":
+            return
+        self.messages += 1
+        with self._lock:
+            self._pending.update(msg["data"]["mids"])
+
+    def _run_socket(self):
+        import websocket  # websocket-client; only needed in ws mode
+
+        delay = 1
+        while True:
+            app_ws = websocket.WebSocketApp(self.url, on_open=self._on_open,
+                                            on_message=self._on_message)
+            app_ws.run_forever()
+            if self.connected:
+                delay = 1
+            self.connected = False
+            time.sleep(delay)
+            delay = min(delay * 2, WS_RECONNECT_MAX)
+
+    def _run_publisher(self):
+        while True:
+            time.sleep(self.publish_interval)
+            with self._lock:
+                mids, self._pending = self._pending, {}
+            if not mids:
+                continue
+            # A bad push must not stop publishing until the next REST resync
+            try:
+                self.apply(mids)
+            except Exception:
+                UPSTREAM_ERRORS.inc("allMids")
+                traceback.print_exc()
@@ -0,0 +1,133 @@
+"""
+Local stand-in for the Hyperliquid WebSocket feed.
+
+Replays recorded messages (one JSON message per line) to every client that
+connects, so WebSocket ingestion can be exercised without the real feed:
+
+    python tools/ws_replay.py tools/allmids_sample.jsonl --port 8765 --loop
+    INGEST_MODE=ws HYPERLIQUID_WS_URL=ws://127.0.0.1:8765 python app.py
+
+Stdlib only; implements just enough of RFC 6455 for unfragmented text
+frames from the server and masked frames from the client.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def encode_frame(payload, opcode=0x1):
+    """Unmasked server -> client frame."""
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", n)
+    else:
+        header += bytes([127]) + struct.pack("!Q", n)
+    return header + payload
+
+
+def read_frame(rfile):
+    """Read one client frame; returns (opcode, payload) or (None, b"") on EOF."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None, b""
+    opcode = head[0] & 0x0F
+    n = head[1] & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", rfile.read(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", rfile.read(8))[0]
+    mask = rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+    data = rfile.read(n)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+
+class ReplayHandler(socketserver.StreamRequestHandler):
+    messages = []
+    interval = 0.5
+    loop = False
+
+    def handshake(self):
+        headers = {}
+        self.rfile.readline()  # request line
+        for line in iter(self.rfile.readline, b"\r\n"):
+            if not line:
+                return False
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if not key:
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.wfile.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                          "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        return True
+
+    def read_client(self, closed):
+        """Drain client frames: log subscriptions, answer pings, stop on close."""
+        while not closed.is_set():
+            try:
+                opcode, payload = read_frame(self.rfile)
+            except OSError:
+                opcode = None
+            if opcode is None or opcode == 0x8:
+                closed.set()
+            elif opcode == 0x9:
+                self.wfile.write(encode_frame(payload, opcode=0xA))
+            elif opcode == 0x1:
+                print(f"{self.client_address[0]} -> {payload.decode()}")
+
+    def handle(self):
+        if not self.handshake():
+            return
+        closed = threading.Event()
+        threading.Thread(target=self.read_client, args=(closed,), daemon=True).start()
+        try:
+            while not closed.is_set():
+                for message in self.messages:
+                    if closed.is_set():
+                        break
+                    self.wfile.write(encode_frame(message))
+                    time.sleep(self.interval)
+                if not self.loop:
+                    closed.wait()
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("recording", help="file with one recorded JSON message per line")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.5,
+                        help="seconds between replayed messages")
+    parser.add_argument("--loop", action="store_true", help="replay forever")
+    args = parser.parse_args()
+
+    with open(args.recording) as f:
+        ReplayHandler.messages = [json.dumps(json.loads(line)).encode()
+                                  for line in f if line.strip()]
+    ReplayHandler.interval = args.interval
+    ReplayHandler.loop = args.loop
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    with socketserver.ThreadingTCPServer((args.host, args.port), ReplayHandler) as server:
+        print(f"Replaying {len(ReplayHandler.messages)} messages on ws://{args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()